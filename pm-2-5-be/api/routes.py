@@ -2,22 +2,128 @@
 Flask API Routes - PM2.5 Prediction Only (NO AQI)
 With standardized error handling and validation
 """
-from flask import request
+from flask import request, g, has_request_context
 import time
+import queue
+import threading
 import numpy as np
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
 from typing import Tuple, Dict
 from utils.logger import main_logger as logger, pm25_logger
 from utils.cache_manager import PredictionCache
-from core.predictor import predict_pm25_for_district
-from config.settings import TZ_VN, MAX_WORKERS, DEFAULT_API_KEY, CACHE_TTL_PREDICTION
-import traceback
+from core.predictor import (
+    build_features_for_district,
+    finalize_prediction_result, predict_pm25_batch
+)
+from config.settings import (
+    TZ_VN, MAX_WORKERS, DEFAULT_API_KEY, CACHE_TTL_PREDICTION,
+    CACHE_TTL_PREDICTION_HISTORICAL, PREDICTION_HISTORICAL_AFTER_HOURS,
+    PREDICT_BATCH_SIZE, PREDICT_BATCH_TIMEOUT
+)
+from operator import itemgetter
+import heapq
+
+# C-level field extractor for GeoJSON feature building
+_GEOJSON_FIELDS = itemgetter(
+    'id', 'name', 'name_en', 'pm25_prediction',
+    'population', 'area_km2', 'type', 'lon', 'lat'
+)
 
 # Initialize prediction cache
 prediction_cache = PredictionCache(ttl=CACHE_TTL_PREDICTION)
 
 
+def cache_minute(minute: int) -> int:
+    """
+    Bucket the minute to 15-minute grain for prediction cache keys.
+
+    Validation already requires data >= 30 minutes old, so 10:01 and 10:02
+    queries are backed by the same source data; per-minute keys would re-run
+    the whole batch for near-duplicate requests. Note the coarsening is
+    visible on cache hits: the stored payload's prediction_info and
+    predicted_time carry the minute of the request that filled the bucket,
+    so a query for :14 can come back labeled :00-:14 from the same bucket.
+    """
+    return (minute // 15) * 15
+
+
+# ==================== MICRO-BATCHED PREDICTION ====================
+class BatchedPredictor:
+    """
+    Micro-batches concurrent single-district predictions into one model call.
+
+    Requests arriving within `batch_timeout` seconds (up to `batch_size`) are
+    stacked into one (N, n_features) matrix so scaler.transform/model.predict
+    run once per batch instead of once per request.
+    """
+
+    def __init__(self, model, scaler,
+                 batch_size: int = PREDICT_BATCH_SIZE,
+                 batch_timeout: float = PREDICT_BATCH_TIMEOUT):
+        self.model = model
+        self.scaler = scaler
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self._worker_loop, daemon=True)
+        self.worker.start()
+
+    def predict(self, features: np.ndarray) -> float:
+        """Enqueue one (1, n_features) row and block until its prediction."""
+        future = Future()
+        self.queue.put((features, future))
+        return future.result()
+
+    def _worker_loop(self):
+        while True:
+            batch = [self.queue.get()]
+
+            # Drain more requests until batch is full or timeout expires
+            deadline = time.monotonic() + self.batch_timeout
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                X = np.vstack([features for features, _ in batch])
+                predictions = self.model.predict(self.scaler.transform(X))
+
+                if len(batch) > 1:
+                    logger.debug(f"⚡ Batched {len(batch)} predictions into one model call")
+
+                for (_, future), prediction in zip(batch, predictions):
+                    future.set_result(float(prediction))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+
+# ==================== REQUEST TIME ====================
+def request_now() -> datetime:
+    """
+    Current VN time, computed once per request (via flask.g).
+
+    Response building touches the clock 3-5 times per request; reusing a
+    single per-request value avoids repeated timezone lookups.
+    """
+    if has_request_context():
+        return g.now_vn
+    return datetime.now(TZ_VN)
+
+
+def request_now_iso() -> str:
+    """ISO timestamp matching request_now(), cached per request."""
+    if has_request_context():
+        return g.now_iso
+    return datetime.now(TZ_VN).isoformat()
+
+
 # ==================== ERROR HANDLING ====================
 def error_response(json_response_func, error_code: str, message: str, details: dict = None, status_code: int = 400):
     """
@@ -29,13 +135,17 @@ def error_response(json_response_func, error_code: str, message: str, details: d
         message: Human-readable message (Vietnamese)
         details: Additional info for debugging
         status_code: HTTP status code
+
+    The timestamp reuses the per-request g.now_iso value and details is
+    attached only when truthy, so validation-reject paths (the common
+    4xx case) do no extra clock or dict work.
     """
     response = {
         "success": False,
         "error": {
             "code": error_code,
             "message": message,
-            "timestamp": datetime.now(TZ_VN).isoformat()
+            "timestamp": request_now_iso()
         }
     }
     
@@ -52,7 +162,7 @@ def success_response(json_response_func, data: dict, message: str = None):
     response = {
         "success": True,
         "data": data,
-        "timestamp": datetime.now(TZ_VN).isoformat()
+        "timestamp": request_now_iso()
     }
     
     if message:
@@ -62,15 +172,20 @@ def success_response(json_response_func, data: dict, message: str = None):
 
 
 # ==================== VALIDATION ====================
-def validate_prediction_request(year: int, month: int, day: int, hour: int, minute: int = 0) -> Tuple[bool, str, str, Dict]:
+def validate_only(year: int, month: int, day: int, hour: int, minute: int = 0) -> Tuple[bool, str, str, Dict, Dict]:
     """
-    Validate prediction request time.
-    
+    Check the three time rules without building the info dict.
+
     Returns:
-        (is_valid, error_code, error_message, info_dict)
+        (is_valid, error_code, error_message, details, times_dict)
+
+        details is only built on failure. times_dict holds the localized
+        target_time/prediction_time datetime objects (None on failure);
+        pass it to build_info() when the success payload is needed —
+        cache-hit paths can skip that strftime-heavy work entirely.
     """
-    now = datetime.now(TZ_VN)
-    target_time = TZ_VN.localize(datetime(year, month, day, hour, minute))
+    now = request_now()
+    target_time = datetime(year, month, day, hour, minute, tzinfo=TZ_VN)
     
     # Calculate prediction time (target + 1 hour)
     prediction_time = target_time + timedelta(hours=1)
@@ -90,7 +205,7 @@ def validate_prediction_request(year: int, month: int, day: int, hour: int, minu
             "suggestion": f"Thử với thời gian <= {now.strftime('%H:%M')}"
         }
         
-        return False, "FUTURE_TIME", message, details
+        return False, "FUTURE_TIME", message, details, None
     
     # RULE 2: Target time should be at least 30 minutes ago for data availability
     safe_time = now - timedelta(minutes=30)
@@ -108,7 +223,7 @@ def validate_prediction_request(year: int, month: int, day: int, hour: int, minu
             "reason": "Weather API cần thời gian đồng bộ dữ liệu (30 phút)"
         }
         
-        return False, "TIME_TOO_RECENT", message, details
+        return False, "TIME_TOO_RECENT", message, details, None
     
     # RULE 3: Don't allow too far in past (90 days)
     oldest_allowed = now - timedelta(days=90)
@@ -121,13 +236,25 @@ def validate_prediction_request(year: int, month: int, day: int, hour: int, minu
             "days_difference": (now - target_time).days
         }
         
-        return False, "TIME_TOO_OLD", message, details
-    
-    # ✅ All good! Return info
+        return False, "TIME_TOO_OLD", message, details, None
+
+    # ✅ All good!
+    return True, None, None, None, {"target_time": target_time, "prediction_time": prediction_time}
+
+
+def build_info(times: Dict) -> Dict:
+    """
+    Build the prediction_info dict for a validated request.
+
+    Six strftime calls — deliberately separate from validate_only() so
+    cache-hit paths don't pay for it.
+    """
+    target_time = times['target_time']
+    prediction_time = times['prediction_time']
     t_minus_2 = target_time - timedelta(hours=2)
     t_minus_1 = target_time - timedelta(hours=1)
-    
-    info = {
+
+    return {
         "target_time": target_time.strftime('%Y-%m-%d %H:%M'),
         "prediction_for": prediction_time.strftime('%Y-%m-%d %H:%M'),
         "data_from": {
@@ -138,48 +265,110 @@ def validate_prediction_request(year: int, month: int, day: int, hour: int, minu
         "explanation": f"Sử dụng dữ liệu từ {t_minus_2.strftime('%H:%M')} - {target_time.strftime('%H:%M')} để dự đoán PM2.5 lúc {prediction_time.strftime('%H:%M')}",
         "explanation_en": f"Using data from {t_minus_2.strftime('%H:%M')} - {target_time.strftime('%H:%M')} to predict PM2.5 at {prediction_time.strftime('%H:%M')}"
     }
-    
-    return True, None, None, info
+
+
+# ==================== PAYLOAD PARSING ====================
+_TIME_FIELDS = ('year', 'month', 'day', 'hour')
+
+
+def parse_prediction_payload(payload, require_district: bool = False) -> Tuple[Dict, str, str, Dict]:
+    """
+    Parse and validate the numeric payload fields in a single typed pass.
+
+    Returns:
+        (parsed, error_code, error_message, details) — parsed is None on
+        failure. Replaces the per-handler required-field scan plus
+        field-by-field int() conversions.
+    """
+    if not payload:
+        return None, "MISSING_BODY", "Thiếu dữ liệu JSON trong request", None
+
+    required = list(_TIME_FIELDS) + (['district_id'] if require_district else [])
+    missing = [f for f in required if f not in payload]
+    if missing:
+        return None, "MISSING_FIELDS", \
+            f"Thiếu các trường bắt buộc: {', '.join(missing)}", \
+            {"required_fields": required, "missing_fields": missing}
+
+    try:
+        parsed = {
+            "year": int(payload['year']),
+            "month": int(payload['month']),
+            "day": int(payload['day']),
+            "hour": int(payload['hour']),
+            "minute": int(payload.get('minute', 0)),
+            "api_key": payload.get('api_key', DEFAULT_API_KEY)
+        }
+        if require_district:
+            parsed["district_id"] = int(payload['district_id'])
+    except (TypeError, ValueError) as e:
+        return None, "INVALID_INPUT", "Dữ liệu đầu vào không hợp lệ", {"error": str(e)}
+
+    return parsed, None, None, None
 
 
 # ==================== ROUTE REGISTRATION ====================
 def register_routes(app, model, scaler, feature_columns, districts, model_info, 
                    cache_manager, json_response):
     """Register all API routes."""
-    
+
+    # Pre-index districts for O(1) lookup instead of scanning on every request
+    districts_by_id = {d['id']: d for d in districts}
+    available_ids = list(districts_by_id.keys())
+
+    # id -> position in id-sorted order, for sort-free batch result gathering
+    district_index = {
+        d_id: i for i, d_id in enumerate(sorted(districts_by_id))
+    }
+
+    # Shared micro-batcher so concurrent single predictions hit the model once
+    batched_predictor = BatchedPredictor(model, scaler)
+
+    @app.before_request
+    def _cache_request_time():
+        """Compute the VN timestamp once per request for all response paths."""
+        g.now_vn = datetime.now(TZ_VN)
+        g.now_iso = g.now_vn.isoformat()
+
+    # Static part of the health payload, built once — load balancers poll
+    # this endpoint every few seconds
+    health_static = {
+        "status": "healthy",
+        "version": "2.0-modular-pm25-only",
+        "optimizations": {
+            "cache_enabled": True,
+            "prediction_cache_enabled": True,
+            "modular_design": True,
+            "pm25_detailed_logging": True,
+            "smart_data_fetching": True,
+            "standardized_error_handling": True
+        },
+        "model": {
+            "type": model_info.get('best_model'),
+            "features": len(feature_columns),
+            "rmse": model_info.get('best_rmse'),
+            "r2": model_info.get('best_r2')
+        },
+        "districts_loaded": len(districts),
+        "usage": {
+            "description": "Predict PM2.5 for NEXT HOUR based on LAST 3 HOURS",
+            "example": "Query 10:00 uses data from 08:00, 09:00, 10:00 to predict 11:00",
+            "validation_rules": {
+                "rule_1": "Target time must be <= current time (no future)",
+                "rule_2": "Target time must be >= 30 minutes ago (data availability)",
+                "rule_3": "Target time must be within 90 days (maximum history)"
+            }
+        }
+    }
+
     @app.route('/health', methods=['GET'])
     def health():
         """Health check endpoint."""
         return json_response({
-            "status": "healthy",
-            "version": "2.0-modular-pm25-only",
-            "optimizations": {
-                "cache_enabled": True,
-                "prediction_cache_enabled": True,
-                "modular_design": True,
-                "pm25_detailed_logging": True,
-                "smart_data_fetching": True,
-                "standardized_error_handling": True
-            },
+            **health_static,
             "cache_stats": cache_manager.stats(),
             "prediction_cache_stats": prediction_cache.stats(),
-            "model": {
-                "type": model_info.get('best_model'),
-                "features": len(feature_columns),
-                "rmse": model_info.get('best_rmse'),
-                "r2": model_info.get('best_r2')
-            },
-            "districts_loaded": len(districts),
-            "timestamp": datetime.now(TZ_VN).isoformat(),
-            "usage": {
-                "description": "Predict PM2.5 for NEXT HOUR based on LAST 3 HOURS",
-                "example": "Query 10:00 uses data from 08:00, 09:00, 10:00 to predict 11:00",
-                "validation_rules": {
-                    "rule_1": "Target time must be <= current time (no future)",
-                    "rule_2": "Target time must be >= 30 minutes ago (data availability)",
-                    "rule_3": "Target time must be within 90 days (maximum history)"
-                }
-            }
+            "timestamp": request_now_iso()
         })
 
     @app.route('/api/v2/cache/clear', methods=['POST'])
@@ -203,19 +392,19 @@ def register_routes(app, model, scaler, feature_columns, districts, model_info,
                 "total": len(districts),
                 "districts": districts
             },
-            "timestamp": datetime.now(TZ_VN).isoformat()
+            "timestamp": request_now_iso()
         })
 
     @app.route('/api/v2/districts/<int:district_id>', methods=['GET'])
     def get_district_by_id(district_id: int):
         """Get specific district by ID."""
-        district = next((d for d in districts if d['id'] == district_id), None)
+        district = districts_by_id.get(district_id)
         if not district:
             return error_response(
                 json_response,
                 "DISTRICT_NOT_FOUND",
                 f"Không tìm thấy quận/huyện có ID {district_id}",
-                {"available_ids": [d['id'] for d in districts]},
+                {"available_ids": available_ids},
                 404
             )
 
@@ -238,54 +427,60 @@ def register_routes(app, model, scaler, feature_columns, districts, model_info,
         }
         """
         try:
-            payload = request.get_json()
-            if not payload:
-                return error_response(
-                    json_response,
-                    "MISSING_BODY",
-                    "Thiếu dữ liệu JSON trong request"
-                )
-
-            required = ['year', 'month', 'day', 'hour', 'district_id']
-            missing = [f for f in required if f not in payload]
-            if missing:
-                return error_response(
-                    json_response,
-                    "MISSING_FIELDS",
-                    f"Thiếu các trường bắt buộc: {', '.join(missing)}",
-                    {"required_fields": required, "missing_fields": missing}
-                )
+            parsed, error_code, error_msg, details = parse_prediction_payload(
+                request.get_json(), require_district=True
+            )
+            if parsed is None:
+                return error_response(json_response, error_code, error_msg, details)
 
-            year = int(payload['year'])
-            month = int(payload['month'])
-            day = int(payload['day'])
-            hour = int(payload['hour'])
-            minute = int(payload.get('minute', 0))
-            district_id = int(payload['district_id'])
-            api_key = payload.get('api_key', DEFAULT_API_KEY)
+            year, month, day = parsed['year'], parsed['month'], parsed['day']
+            hour, minute = parsed['hour'], parsed['minute']
+            district_id = parsed['district_id']
+            api_key = parsed['api_key']
 
             # ✅ VALIDATE REQUEST
-            is_valid, error_code, error_msg, info = validate_prediction_request(year, month, day, hour, minute)
+            is_valid, error_code, error_msg, details, times = validate_only(year, month, day, hour, minute)
             if not is_valid:
-                return error_response(json_response, error_code, error_msg, info)
+                return error_response(json_response, error_code, error_msg, details)
 
+            info = build_info(times)
             logger.info(f"📍 Single prediction: district {district_id} at {year}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}")
             logger.info(f"   → {info['explanation']}")
 
-            district = next((d for d in districts if d['id'] == district_id), None)
+            district = districts_by_id.get(district_id)
             if not district:
                 return error_response(
                     json_response,
                     "DISTRICT_NOT_FOUND",
                     f"Không tìm thấy quận/huyện có ID {district_id}",
-                    {"available_ids": [d['id'] for d in districts]},
+                    {"available_ids": available_ids},
                     404
                 )
 
-            result = predict_pm25_for_district(
-                district, year, month, day, hour, minute, api_key,
-                model, scaler, feature_columns
+            # Repeat requests for the same district/time within the TTL
+            # collapse to one dict lookup instead of 6 API calls + inference
+            minute_bucket = cache_minute(minute)
+            cached_pred = cache_manager.get_or_none(
+                'pred', CACHE_TTL_PREDICTION,
+                district_id, year, month, day, hour, minute_bucket
             )
+            if cached_pred is not None:
+                result = dict(cached_pred)
+            else:
+                built = build_features_for_district(
+                    district, year, month, day, hour, minute, api_key, feature_columns
+                )
+
+                if built['status'] == 'success':
+                    # Model call goes through the shared micro-batcher
+                    prediction = batched_predictor.predict(built['features'])
+                    result = finalize_prediction_result(district, prediction, built['features_t0'])
+                    cache_manager.store(
+                        'pred', dict(result),
+                        district_id, year, month, day, hour, minute_bucket
+                    )
+                else:
+                    result = built
 
             if result['status'] == 'error':
                 return error_response(
@@ -297,7 +492,7 @@ def register_routes(app, model, scaler, feature_columns, districts, model_info,
                 )
 
             result['prediction_info'] = info
-            result['timestamp_query'] = datetime.now(TZ_VN).isoformat()
+            result['timestamp_query'] = request_now_iso()
 
             return success_response(json_response, result, "Dự đoán thành công")
 
@@ -311,8 +506,8 @@ def register_routes(app, model, scaler, feature_columns, districts, model_info,
                 400
             )
         except Exception as e:
-            logger.error(f"❌ Error in predict_single: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            # logger.exception defers traceback formatting to the handlers
+            logger.exception("❌ Error in predict_single")
             return error_response(
                 json_response,
                 "INTERNAL_ERROR",
@@ -339,48 +534,33 @@ def register_routes(app, model, scaler, feature_columns, districts, model_info,
         try:
             start_time = time.time()
 
-            payload = request.get_json()
-            if not payload:
-                return error_response(
-                    json_response,
-                    "MISSING_BODY",
-                    "Thiếu dữ liệu JSON trong request"
-                )
-
-            required = ['year', 'month', 'day', 'hour']
-            missing = [f for f in required if f not in payload]
-            if missing:
-                return error_response(
-                    json_response,
-                    "MISSING_FIELDS",
-                    f"Thiếu các trường bắt buộc: {', '.join(missing)}",
-                    {"required_fields": required, "missing_fields": missing}
-                )
+            parsed, error_code, error_msg, details = parse_prediction_payload(
+                request.get_json()
+            )
+            if parsed is None:
+                return error_response(json_response, error_code, error_msg, details)
 
-            year = int(payload['year'])
-            month = int(payload['month'])
-            day = int(payload['day'])
-            hour = int(payload['hour'])
-            minute = int(payload.get('minute', 0))
-            api_key = payload.get('api_key', DEFAULT_API_KEY)
+            year, month, day = parsed['year'], parsed['month'], parsed['day']
+            hour, minute = parsed['hour'], parsed['minute']
+            api_key = parsed['api_key']
 
             # ✅ VALIDATE REQUEST
-            is_valid, error_code, error_msg, info = validate_prediction_request(year, month, day, hour, minute)
+            is_valid, error_code, error_msg, details, times = validate_only(year, month, day, hour, minute)
             if not is_valid:
                 logger.warning(f"⚠️  Validation failed: {error_code}")
                 logger.warning(f"   Message: {error_msg}")
-                return error_response(json_response, error_code, error_msg, info)
+                return error_response(json_response, error_code, error_msg, details)
 
-            # Check prediction cache first
-            cached_result = prediction_cache.get(year, month, day, hour, minute)
+            # Check prediction cache first (cached payload already carries
+            # its own prediction_info — no need to build it here)
+            cached_result = prediction_cache.get(year, month, day, hour, cache_minute(minute))
             if cached_result:
                 logger.info(f"⚡ Returning cached prediction result")
-                # Wrap cached result in success format if not already
-                if 'success' not in cached_result:
-                    return success_response(json_response, cached_result, "Dự đoán thành công (từ cache)")
-                return json_response(cached_result)
+                return success_response(json_response, cached_result, "Dự đoán thành công (từ cache)")
 
-            target_time = TZ_VN.localize(datetime(year, month, day, hour, minute))
+            # Cache miss: now build info and reuse the validated datetime
+            info = build_info(times)
+            target_time = times['target_time']
 
             logger.info(f"\n{'='*70}")
             logger.info(f"🌆 BATCH PREDICTION - ALL DISTRICTS")
@@ -389,29 +569,41 @@ def register_routes(app, model, scaler, feature_columns, districts, model_info,
             logger.info(f"   Total: {len(districts)} districts")
             logger.info(f"{'='*70}")
 
-            # Parallel prediction
-            results = []
-            errors = []
+            # Parallel feature building (I/O-bound), then ONE batched model call.
+            # Completions land in pre-allocated slots keyed by district index,
+            # so the output is id-ordered without any final sort.
+            slots = [None] * len(districts)
 
             with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
                 futures = {
                     executor.submit(
-                        predict_pm25_for_district,
+                        build_features_for_district,
                         district, year, month, day, hour, minute, api_key,
-                        model, scaler, feature_columns
+                        feature_columns
                     ): district for district in districts
                 }
 
                 for future in as_completed(futures):
-                    result = future.result()
+                    district = futures[future]
+                    slots[district_index[district['id']]] = (district, future.result())
 
-                    if result['status'] == 'success':
-                        results.append(result)
-                    else:
-                        errors.append(result)
+            built_ok = []
+            errors = []
+            for slot in slots:
+                if slot is None:
+                    continue
+                district, built = slot
+                if built['status'] == 'success':
+                    built_ok.append((district, built))
+                else:
+                    errors.append(built)
 
-            results.sort(key=lambda x: x['id'])
-            errors.sort(key=lambda x: x['id'])
+            # Single vectorized predict over all districts. The thread pool
+            # above only does network I/O (which releases the GIL); keeping
+            # sklearn out of the workers means one BLAS-parallel model call
+            # instead of GIL-contended per-district inference, without the
+            # serialization cost a ProcessPoolExecutor would add.
+            results = predict_pm25_batch(built_ok, model, scaler)
 
             # Summary logging
             expected = len(districts)
@@ -430,24 +622,28 @@ def register_routes(app, model, scaler, feature_columns, districts, model_info,
 
             logger.info(f"{'='*70}\n")
 
-            # Calculate statistics
+            # Calculate statistics (single NumPy pass, no per-metric Python loops)
             if results:
-                pm25_values = [r['pm25_prediction'] for r in results]
+                pm25_values = np.fromiter(
+                    (r['pm25_prediction'] for r in results),
+                    dtype=np.float32, count=success
+                )
+                above_15 = int((pm25_values > 15).sum())
                 statistics = {
-                    "city_average": round(np.mean(pm25_values), 2),
-                    "city_max": round(np.max(pm25_values), 2),
-                    "city_min": round(np.min(pm25_values), 2),
-                    "city_median": round(np.median(pm25_values), 2),
-                    "city_std": round(np.std(pm25_values), 2),
+                    "city_average": round(float(pm25_values.mean()), 2),
+                    "city_max": round(float(pm25_values.max()), 2),
+                    "city_min": round(float(pm25_values.min()), 2),
+                    "city_median": round(float(np.median(pm25_values)), 2),
+                    "city_std": round(float(pm25_values.std()), 2),
                     "total_districts_successful": success,
                     "total_districts_expected": expected,
                     "total_districts_failed": failed,
                     "success_rate_percent": round(success/expected*100, 2),
                     "who_standard_15": {
-                        "above": sum(1 for v in pm25_values if v > 15),
-                        "below": sum(1 for v in pm25_values if v <= 15)
+                        "above": above_15,
+                        "below": success - above_15
                     },
-                    "unhealthy_threshold_55": sum(1 for v in pm25_values if v > 55.4)
+                    "unhealthy_threshold_55": int((pm25_values > 55.4).sum())
                 }
                 
                 pm25_logger.log_summary(
@@ -485,14 +681,23 @@ def register_routes(app, model, scaler, feature_columns, districts, model_info,
                 response_data["errors"] = errors
                 response_data["warning"] = f"Failed {failed}/{expected} districts"
 
-            # Cache the SUCCESS response (wrapped)
-            success_wrapped = {
-                "success": True,
-                "data": response_data,
-                "message": "Dự đoán thành công",
-                "timestamp": datetime.now(TZ_VN).isoformat()
-            }
-            prediction_cache.set(year, month, day, hour, minute, success_wrapped)
+            # Cache the canonical UNWRAPPED payload; every read path wraps
+            # it via success_response on the way out.
+            # Historical targets are immutable, but only fully successful
+            # runs earn the long TTL — a degraded payload (failed
+            # districts) keeps the short one, and an all-failed run isn't
+            # cached at all, so a transient upstream outage can't be
+            # re-served for 30 days
+            if results:
+                if failed == 0 and target_time < request_now() - timedelta(
+                        hours=PREDICTION_HISTORICAL_AFTER_HOURS):
+                    prediction_ttl = CACHE_TTL_PREDICTION_HISTORICAL
+                else:
+                    prediction_ttl = CACHE_TTL_PREDICTION
+                prediction_cache.set(year, month, day, hour, cache_minute(minute),
+                                     response_data, ttl=prediction_ttl)
+            else:
+                logger.warning("⚠️  No successful districts — response not cached")
 
             return success_response(json_response, response_data, "Dự đoán thành công")
 
@@ -506,8 +711,7 @@ def register_routes(app, model, scaler, feature_columns, districts, model_info,
                 400
             )
         except Exception as e:
-            logger.error(f"❌ CRITICAL ERROR: {type(e).__name__}: {str(e)}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.exception(f"❌ CRITICAL ERROR: {type(e).__name__}: {str(e)}")
             return error_response(
                 json_response,
                 "INTERNAL_ERROR",
@@ -524,35 +728,27 @@ def register_routes(app, model, scaler, feature_columns, districts, model_info,
         """
         try:
             payload = request.get_json()
-            if not payload:
-                return error_response(
-                    json_response,
-                    "MISSING_BODY",
-                    "Thiếu dữ liệu JSON trong request"
-                )
+            parsed, error_code, error_msg, details = parse_prediction_payload(payload)
+            if parsed is None:
+                return error_response(json_response, error_code, error_msg, details)
 
-            year = int(payload['year'])
-            month = int(payload['month'])
-            day = int(payload['day'])
-            hour = int(payload['hour'])
-            minute = int(payload.get('minute', 0))
+            year, month, day = parsed['year'], parsed['month'], parsed['day']
+            hour, minute = parsed['hour'], parsed['minute']
 
             # ✅ VALIDATE REQUEST
-            is_valid, error_code, error_msg, info = validate_prediction_request(year, month, day, hour, minute)
+            is_valid, error_code, error_msg, details, times = validate_only(year, month, day, hour, minute)
             if not is_valid:
-                return error_response(json_response, error_code, error_msg, info)
+                return error_response(json_response, error_code, error_msg, details)
 
             # Try to reuse cached prediction
-            cached = prediction_cache.get(year, month, day, hour, minute)
+            cached = prediction_cache.get(year, month, day, hour, cache_minute(minute))
             if cached:
                 logger.info("⚡ Reusing cached prediction for ranking")
-                # Handle both wrapped and unwrapped cache formats
-                if 'data' in cached:
-                    districts_data = cached['data']['districts']
-                    stats = cached['data']['statistics']
-                else:
-                    districts_data = cached['districts']
-                    stats = cached['statistics']
+                # Cache stores the unwrapped payload; reuse its
+                # prediction_info instead of rebuilding it
+                districts_data = cached['districts']
+                stats = cached['statistics']
+                info = cached.get('prediction_info') or build_info(times)
             else:
                 return error_response(
                     json_response,
@@ -566,12 +762,27 @@ def register_routes(app, model, scaler, feature_columns, districts, model_info,
             order = payload.get('order', 'desc')
             limit = int(payload.get('limit', 10))
 
-            # Sort districts
+            # Partial sorts: O(N log k) heap selection instead of three full sorts
             reverse = (order == 'desc')
+            key_pm25 = itemgetter('pm25_prediction')
+
+            best_air = heapq.nsmallest(5, districts_data, key=key_pm25)
+            worst_air = heapq.nlargest(5, districts_data, key=key_pm25)
+
             if sort_by == 'pm25':
-                sorted_districts = sorted(districts_data, key=lambda x: x['pm25_prediction'], reverse=reverse)
+                if limit <= 5:
+                    # Top-k already computed for best/worst views
+                    ranking = (worst_air if reverse else best_air)[:limit]
+                elif reverse:
+                    ranking = heapq.nlargest(limit, districts_data, key=key_pm25)
+                else:
+                    ranking = heapq.nsmallest(limit, districts_data, key=key_pm25)
             elif sort_by == 'population':
-                sorted_districts = sorted(districts_data, key=lambda x: x['population'], reverse=reverse)
+                key_pop = itemgetter('population')
+                if reverse:
+                    ranking = heapq.nlargest(limit, districts_data, key=key_pop)
+                else:
+                    ranking = heapq.nsmallest(limit, districts_data, key=key_pop)
             else:
                 return error_response(
                     json_response,
@@ -586,9 +797,9 @@ def register_routes(app, model, scaler, feature_columns, districts, model_info,
                 "sort_by": sort_by,
                 "order": order,
                 "limit": limit,
-                "ranking": sorted_districts[:limit],
-                "best_air_quality": sorted(districts_data, key=lambda x: x['pm25_prediction'])[:5],
-                "worst_air_quality": sorted(districts_data, key=lambda x: x['pm25_prediction'], reverse=True)[:5],
+                "ranking": ranking,
+                "best_air_quality": best_air,
+                "worst_air_quality": worst_air,
                 "statistics": stats
             }
 
@@ -611,30 +822,29 @@ def register_routes(app, model, scaler, feature_columns, districts, model_info,
         Reuses cached prediction result if available.
         """
         try:
-            payload = request.get_json()
+            parsed, error_code, error_msg, details = parse_prediction_payload(
+                request.get_json()
+            )
+            if parsed is None:
+                return error_response(json_response, error_code, error_msg, details)
 
-            year = int(payload['year'])
-            month = int(payload['month'])
-            day = int(payload['day'])
-            hour = int(payload['hour'])
-            minute = int(payload.get('minute', 0))
+            year, month, day = parsed['year'], parsed['month'], parsed['day']
+            hour, minute = parsed['hour'], parsed['minute']
 
             # ✅ VALIDATE REQUEST
-            is_valid, error_code, error_msg, info = validate_prediction_request(year, month, day, hour, minute)
+            is_valid, error_code, error_msg, details, times = validate_only(year, month, day, hour, minute)
             if not is_valid:
-                return error_response(json_response, error_code, error_msg, info)
+                return error_response(json_response, error_code, error_msg, details)
 
             # Reuse cached prediction
-            cached = prediction_cache.get(year, month, day, hour, minute)
+            cached = prediction_cache.get(year, month, day, hour, cache_minute(minute))
             if cached:
                 logger.info("⚡ Reusing cached prediction for GeoJSON")
-                # Handle both wrapped and unwrapped cache formats
-                if 'data' in cached:
-                    districts_data = cached['data']['districts']
-                    stats = cached['data']['statistics']
-                else:
-                    districts_data = cached['districts']
-                    stats = cached['statistics']
+                # Cache stores the unwrapped payload; reuse its
+                # prediction_info instead of rebuilding it
+                districts_data = cached['districts']
+                stats = cached['statistics']
+                info = cached.get('prediction_info') or build_info(times)
             else:
                 return error_response(
                     json_response,
@@ -644,26 +854,27 @@ def register_routes(app, model, scaler, feature_columns, districts, model_info,
                     404
                 )
 
-            # Create GeoJSON
-            features = []
-            for district in districts_data:
-                feature = {
+            # Create GeoJSON (pre-extracted fields, no per-dict key hashing)
+            features = [
+                {
                     "type": "Feature",
                     "properties": {
-                        "id": district['id'],
-                        "name": district['name'],
-                        "name_en": district['name_en'],
-                        "pm25": district['pm25_prediction'],
-                        "population": district['population'],
-                        "area_km2": district['area_km2'],
-                        "type": district['type']
+                        "id": d_id,
+                        "name": name,
+                        "name_en": name_en,
+                        "pm25": pm25,
+                        "population": population,
+                        "area_km2": area_km2,
+                        "type": d_type
                     },
                     "geometry": {
                         "type": "Point",
-                        "coordinates": [district['lon'], district['lat']]
+                        "coordinates": [lon, lat]
                     }
                 }
-                features.append(feature)
+                for d_id, name, name_en, pm25, population, area_km2, d_type, lon, lat
+                in map(_GEOJSON_FIELDS, districts_data)
+            ]
 
             result_data = {
                 "type": "FeatureCollection",
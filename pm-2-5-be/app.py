@@ -4,6 +4,7 @@ Modular architecture with detailed PM2.5 logging (NO AQI)
 """
 from flask import Flask, Response
 from flask_cors import CORS
+import gc
 import joblib
 import os
 
@@ -11,22 +12,27 @@ import os
 from utils.logger import main_logger as logger
 from utils.cache_manager import CacheManager
 from config.settings import (
-    MODEL_PATH, SCALER_PATH, JSON_PATH, DISTRICTS_PATH,
+    MODEL_PATH, ONNX_MODEL_PATH, SCALER_PATH, JSON_PATH, DISTRICTS_PATH,
     MAX_CACHE_SIZE
 )
 
 # Import routes
 from api.routes import register_routes
+from core.predictor import InlineScaler, OnnxModel
+from core import _feature_kernel, data_fetcher
 
 # ==================== JSON RESPONSE UTILITY ====================
 try:
     import orjson
     USE_ORJSON = True
 
+    # Serialize NumPy scalars/arrays natively; normalize naive datetimes to UTC
+    ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+
     def json_response(data, status=200):
         """Fast JSON response using orjson."""
         return Response(
-            orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY),
+            orjson.dumps(data, option=ORJSON_OPTIONS),
             status=status,
             mimetype='application/json'
         )
@@ -70,14 +76,26 @@ def create_app():
     app.config['JSON_SORT_KEYS'] = False
     app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
 
-    # Load model and data
-    logger.info(f"📦 Loading model from: {MODEL_PATH}")
-    model = joblib.load(MODEL_PATH)
-    logger.info("   ✅ Model loaded")
+    # Load model and data — prefer the ONNX export when available
+    model = None
+    if os.path.exists(ONNX_MODEL_PATH):
+        try:
+            model = OnnxModel(ONNX_MODEL_PATH)
+            logger.info(f"📦 Model loaded via ONNX Runtime: {ONNX_MODEL_PATH}")
+        except ImportError:
+            logger.warning("⚠️  model.onnx present but onnxruntime not installed, using joblib")
+
+    if model is None:
+        logger.info(f"📦 Loading model from: {MODEL_PATH}")
+        # mmap the ensemble's arrays: every worker maps the same file
+        # read-only, so the OS page cache holds one copy of the model
+        # no matter how many gunicorn workers load it
+        model = joblib.load(MODEL_PATH, mmap_mode='r')
+        logger.info("   ✅ Model loaded (mmap)")
 
     logger.info(f"📦 Loading scaler from: {SCALER_PATH}")
-    scaler = joblib.load(SCALER_PATH)
-    logger.info("   ✅ Scaler loaded")
+    scaler = InlineScaler(joblib.load(SCALER_PATH, mmap_mode='r'))
+    logger.info("   ✅ Scaler loaded (inline float32 transform)")
 
     logger.info(f"📦 Loading model info from: {JSON_PATH}")
     model_info = load_json_once(JSON_PATH, "model info")
@@ -89,8 +107,15 @@ def create_app():
     districts = districts_data['districts']
     logger.info(f"   ✅ Loaded {len(districts)} districts")
 
-    # Initialize cache
+    # Compile the feature kernel now rather than on the first request
+    _feature_kernel.warmup()
+    if _feature_kernel.NUMBA_AVAILABLE:
+        logger.info("   ✅ Feature kernel JIT-compiled (numba)")
+
+    # Initialize cache — one instance shared with the data fetchers so
+    # there is a single memory budget and consistent eviction
     cache_manager = CacheManager(max_size=MAX_CACHE_SIZE)
+    data_fetcher.init_cache(cache_manager)
 
     # Register routes
     register_routes(app, model, scaler, feature_columns, districts, 
@@ -112,6 +137,15 @@ def create_app():
             "status": 500
         }, 500)
 
+    # GC tuning: request handling allocates many short-lived, acyclic
+    # objects (dicts, JSON structures). Freeze the startup objects (model,
+    # scaler, districts) out of the young generations and raise the gen-0
+    # threshold so collections are rare and cheap during requests.
+    gc.collect()
+    gc.freeze()
+    gc.set_threshold(50000, 10, 10)
+    logger.info("   ✅ GC tuned: startup objects frozen, threshold raised")
+
     print("=" * 70)
     print("✅ PM2.5 API READY (NO AQI)")
     print(f"   orjson: {'✅ Enabled' if USE_ORJSON else '❌ Disabled'}")
@@ -2,15 +2,18 @@
 Configuration settings for PM2.5 Prediction API
 """
 import os
-import pytz
+from zoneinfo import ZoneInfo
 
 # ==================== TIMEZONE ====================
-TZ_VN = pytz.timezone('Asia/Ho_Chi_Minh')
+TZ_VN = ZoneInfo('Asia/Ho_Chi_Minh')
 
 # ==================== PATHS ====================
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 MODEL_PATH = os.path.join(BASE_DIR, 'models', 'best_pm25_model_20251025_214649.pkl')
+# Optional ONNX export of the same model (see core.predictor.OnnxModel);
+# used automatically when present and onnxruntime is installed
+ONNX_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'best_pm25_model_20251025_214649.onnx')
 SCALER_PATH = os.path.join(BASE_DIR, 'models', 'pm25_scaler_20251025_214649.pkl')
 JSON_PATH = os.path.join(BASE_DIR, 'models', 'pm25_model_summary_20251025_214649.json')
 DISTRICTS_PATH = os.path.join(BASE_DIR, 'config', 'districts.json')
@@ -19,11 +22,30 @@ DISTRICTS_PATH = os.path.join(BASE_DIR, 'config', 'districts.json')
 DEFAULT_API_KEY = "0da082531276d74b1118047941f103c3"
 MAX_WORKERS = 10
 
+# ==================== PREDICTION BATCHING ====================
+PREDICT_BATCH_SIZE = 16         # Max single predictions merged into one model call
+PREDICT_BATCH_TIMEOUT = 0.02    # Seconds to wait for more requests before predicting
+
 # ==================== CACHE SETTINGS ====================
-CACHE_TTL_WEATHER = 3600       # 1 hour for weather data
+# Per-endpoint TTLs: archive data is historical and never changes, so it
+# can live a full day; forecasts are re-issued by open-meteo roughly
+# every 15 minutes, so keep them short
+CACHE_TTL_WEATHER_ARCHIVE = 86400   # 24 hours for archive (immutable) weather
+CACHE_TTL_WEATHER_FORECAST = 900    # 15 minutes for forecast weather
 CACHE_TTL_AIR = 1800            # 30 minutes for air quality
-CACHE_TTL_PREDICTION = 1800     # 30 minutes for prediction results
+CACHE_TTL_PREDICTION = 1800     # 30 minutes for recent prediction results
+
+# Predictions for a (y,m,d,h,m) older than this are immutable — the source
+# weather/air archives no longer change — so they can be cached much longer
+PREDICTION_HISTORICAL_AFTER_HOURS = 2
+CACHE_TTL_PREDICTION_HISTORICAL = 30 * 24 * 3600   # 30 days
+
 MAX_CACHE_SIZE = 2000
+MAX_PREDICTION_CACHE_SIZE = 5000    # Bound for the long-lived historical entries
+
+# Optional L2 prediction cache shared across workers/replicas
+REDIS_URL = os.getenv('REDIS_URL')              # e.g. redis://localhost:6379/0
+REDIS_PREDICTION_PREFIX = 'pm25:predict'
 
 # ==================== HTTP SETTINGS ====================
 MAX_RETRIES = 3
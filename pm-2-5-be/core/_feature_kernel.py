@@ -0,0 +1,189 @@
+"""
+Numeric kernel for per-district feature assembly.
+
+Builds the 40-feature model row from the three hourly raw-feature rows as
+straight-line scalar arithmetic. When numba is installed the kernel is
+JIT-compiled (and releases the GIL, so the thread-pool fan-out in the API
+layer actually runs in parallel); otherwise it runs as plain Python.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+# Optional dependency: numba JIT (falls back to plain Python)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when numba is not installed."""
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrap(func):
+            return func
+        return wrap
+
+# Order of the 15 raw features inside the per-hour input arrays
+RAW_FEATURE_ORDER = (
+    'co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3',
+    'temperature_2m', 'relative_humidity_2m', 'precipitation',
+    'pressure_msl', 'windspeed_10m', 'winddirection_10m',
+    'shortwave_radiation'
+)
+
+# Raw array indices used inside the kernel
+_CO, _NO, _NO2, _O3, _SO2, _PM25, _PM10, _NH3 = range(8)
+_TEMP, _RH, _PRECIP, _PMSL, _WS, _WD, _RAD = range(8, 15)
+
+# Output order of the 40 engineered features (matches the trained model's
+# feature_columns; see models/pm25_model_summary_*.json)
+FEATURE_ORDER = (
+    'pm2_5_lag_1', 'pm2_5_lag_2', 'pm2_5_roll_avg_3hr', 'pm2_5_roll_std_3hr',
+    'pm2_5_diff_1hr', 'temp_diff_1hr', 'temp_roll_avg_3hr', 'humid_diff_1hr',
+    'humid_roll_avg_3hr', 'radiation_lag_1', 'so2_lag_1', 'so2_roll_avg_3hr',
+    'wind_roll_avg_3hr', 'wind_roll_min_3hr', 'co_roll_avg_3hr', 'co_lag_1',
+    'precip_roll_sum_3hr', 'temperature_2m', 'relative_humidity_2m',
+    'precipitation', 'pressure_msl', 'windspeed_10m', 'shortwave_radiation',
+    'co', 'no', 'no2', 'o3', 'so2', 'pm10', 'nh3', 'is_rainy_season',
+    'hour_sin', 'hour_cos', 'month_sin', 'month_cos', 'day_of_week_sin',
+    'day_of_week_cos', 'temp_humidity', 'wind_U', 'wind_V'
+)
+
+_TWO_PI = 2.0 * math.pi
+
+# Cyclic time encodings take only 24/13/7 distinct values — precompute
+# them once at import so the kernel does array lookups instead of trig.
+# (Month table has 13 slots so months 1-12 index directly.)
+_HOUR_SIN = np.sin(_TWO_PI * np.arange(24) / 24.0)
+_HOUR_COS = np.cos(_TWO_PI * np.arange(24) / 24.0)
+_MONTH_SIN = np.sin(_TWO_PI * np.arange(13) / 12.0)
+_MONTH_COS = np.cos(_TWO_PI * np.arange(13) / 12.0)
+_DOW_SIN = np.sin(_TWO_PI * np.arange(7) / 7.0)
+_DOW_COS = np.cos(_TWO_PI * np.arange(7) / 7.0)
+
+# Rainy season in Vietnam is May-October; indexed by month (1-12)
+_RAINY = np.array([0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 1, 0, 0],
+                  dtype=np.float64)
+
+
+@njit(cache=True, fastmath=True)
+def _feature_kernel(t2, t1, t0, hour, day_of_week, month, out):
+    """Fill `out` (40,) with the engineered features for the t-0 row."""
+    pm_t2 = t2[_PM25]
+    pm_t1 = t1[_PM25]
+    pm_t0 = t0[_PM25]
+
+    # Lag features
+    out[0] = pm_t1                                      # pm2_5_lag_1
+    out[1] = pm_t2                                      # pm2_5_lag_2
+
+    # Rolling features over the 3-hour window
+    pm_mean = (pm_t2 + pm_t1 + pm_t0) / 3.0
+    out[2] = pm_mean                                    # pm2_5_roll_avg_3hr
+    # Sample std (ddof=1), matching pandas rolling(...).std()
+    pm_var = ((pm_t2 - pm_mean) ** 2 + (pm_t1 - pm_mean) ** 2
+              + (pm_t0 - pm_mean) ** 2) / 2.0
+    out[3] = math.sqrt(pm_var)                          # pm2_5_roll_std_3hr
+
+    # Diff features
+    out[4] = pm_t0 - pm_t1                              # pm2_5_diff_1hr
+    out[5] = t0[_TEMP] - t1[_TEMP]                      # temp_diff_1hr
+    out[6] = (t2[_TEMP] + t1[_TEMP] + t0[_TEMP]) / 3.0  # temp_roll_avg_3hr
+    out[7] = t0[_RH] - t1[_RH]                          # humid_diff_1hr
+    out[8] = (t2[_RH] + t1[_RH] + t0[_RH]) / 3.0        # humid_roll_avg_3hr
+    out[9] = t1[_RAD]                                   # radiation_lag_1
+    out[10] = t1[_SO2]                                  # so2_lag_1
+    out[11] = (t2[_SO2] + t1[_SO2] + t0[_SO2]) / 3.0    # so2_roll_avg_3hr
+    out[12] = (t2[_WS] + t1[_WS] + t0[_WS]) / 3.0       # wind_roll_avg_3hr
+    out[13] = min(t2[_WS], min(t1[_WS], t0[_WS]))       # wind_roll_min_3hr
+    out[14] = (t2[_CO] + t1[_CO] + t0[_CO]) / 3.0       # co_roll_avg_3hr
+    out[15] = t1[_CO]                                   # co_lag_1
+    out[16] = t2[_PRECIP] + t1[_PRECIP] + t0[_PRECIP]   # precip_roll_sum_3hr
+
+    # Original features at t-0
+    out[17] = t0[_TEMP]
+    out[18] = t0[_RH]
+    out[19] = t0[_PRECIP]
+    out[20] = t0[_PMSL]
+    out[21] = t0[_WS]
+    out[22] = t0[_RAD]
+    out[23] = t0[_CO]
+    out[24] = t0[_NO]
+    out[25] = t0[_NO2]
+    out[26] = t0[_O3]
+    out[27] = t0[_SO2]
+    out[28] = t0[_PM10]
+    out[29] = t0[_NH3]
+
+    # Time features (table lookups, precomputed at import)
+    out[30] = _RAINY[month]                             # is_rainy_season
+    out[31] = _HOUR_SIN[hour]                           # hour_sin
+    out[32] = _HOUR_COS[hour]                           # hour_cos
+    out[33] = _MONTH_SIN[month]                         # month_sin
+    out[34] = _MONTH_COS[month]                         # month_cos
+    out[35] = _DOW_SIN[day_of_week]                     # day_of_week_sin
+    out[36] = _DOW_COS[day_of_week]                     # day_of_week_cos
+
+    # Interaction features
+    out[37] = t0[_TEMP] * t0[_RH]                       # temp_humidity
+    wd_rad = math.radians(t0[_WD])
+    out[38] = t0[_WS] * math.cos(wd_rad)                # wind_U
+    out[39] = t0[_WS] * math.sin(wd_rad)                # wind_V
+
+
+def _raw_array(features) -> np.ndarray:
+    """Pack one hour's RawFeatures record into a kernel input array."""
+    # RawFeatures is (datetime, *RAW_FEATURE_ORDER) — slice positionally
+    return np.array(features[1:], dtype=np.float64)
+
+
+@lru_cache(maxsize=4)
+def _reorder_indices(feature_columns: tuple) -> np.ndarray:
+    """Map FEATURE_ORDER positions onto a model's feature_columns order."""
+    return np.array([FEATURE_ORDER.index(name) for name in feature_columns])
+
+
+def build_feature_row(features_t2, features_t1, features_t0,
+                      feature_columns: list = None) -> np.ndarray:
+    """
+    Build the engineered feature row for the t-0 hour.
+
+    Returns a contiguous (40,) float32 array ordered by `feature_columns`
+    when given, otherwise by FEATURE_ORDER. The kernel computes in float64
+    and the row is cast once at the end — float32 halves the bytes the
+    scaler and model touch per row.
+    """
+    target_time = features_t0.datetime
+    out = np.empty(len(FEATURE_ORDER), dtype=np.float64)
+
+    _feature_kernel(
+        _raw_array(features_t2),
+        _raw_array(features_t1),
+        _raw_array(features_t0),
+        target_time.hour,
+        target_time.weekday(),
+        target_time.month,
+        out
+    )
+
+    if feature_columns and tuple(feature_columns) != FEATURE_ORDER:
+        out = out[_reorder_indices(tuple(feature_columns))]
+
+    return np.ascontiguousarray(out, dtype=np.float32)
+
+
+def warmup():
+    """
+    Trigger JIT compilation of the kernel with dummy inputs.
+
+    Called once at app startup so the first real request doesn't pay the
+    numba compile cost (cached to disk after the first run). A no-op
+    apart from wasted microseconds when numba is not installed.
+    """
+    dummy = np.ones(len(RAW_FEATURE_ORDER), dtype=np.float64)
+    out = np.empty(len(FEATURE_ORDER), dtype=np.float64)
+    _feature_kernel(dummy, dummy, dummy, 0, 0, 1, out)
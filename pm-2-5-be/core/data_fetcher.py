@@ -1,27 +1,74 @@
 """
 Data fetching logic for air quality and weather data
 """
-from datetime import datetime, timedelta
-import pandas as pd
-import pytz
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
 from utils.http_session import http_session
 from utils.cache_manager import CacheManager
 from utils.logger import main_logger as logger
 from config.settings import (
-    CACHE_TTL_AIR, CACHE_TTL_WEATHER, TIMEOUT, TZ_VN
+    CACHE_TTL_AIR, CACHE_TTL_WEATHER_ARCHIVE, CACHE_TTL_WEATHER_FORECAST,
+    TIMEOUT, TZ_VN, MAX_WORKERS
 )
 
-# Initialize cache
+# Optional dependency: orjson parses the raw response bytes directly,
+# skipping requests' Python-level decode (same pattern as app.py)
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
+# Shared cache. create_app() injects its instance via init_cache() so the
+# fetchers and the API layer share one LRU/TTL budget; the default here
+# only covers standalone use of this module (scripts, shell).
 cache_manager = CacheManager()
 
 
-def fetch_air_quality_at_time(timestamp_utc: int, api_key: str, 
+def init_cache(manager: CacheManager) -> None:
+    """Adopt the app's CacheManager instead of the module-level default."""
+    global cache_manager
+    cache_manager = manager
+
+# Pool for overlapping the air + weather request pair per timestamp;
+# http_session's connection pool handles keep-alive across these threads
+_api_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS * 2)
+
+
+class RawFeatures(NamedTuple):
+    """
+    One hour's 15 raw features plus its timestamp.
+
+    A NamedTuple instead of a dict: contiguous storage, positional access,
+    and no per-request string-key hashing. Field order after `datetime`
+    matches core._feature_kernel.RAW_FEATURE_ORDER so the kernel can
+    slice the tuple directly.
+    """
+    datetime: datetime
+    co: float
+    no: float
+    no2: float
+    o3: float
+    so2: float
+    pm2_5: float
+    pm10: float
+    nh3: float
+    temperature_2m: float
+    relative_humidity_2m: float
+    precipitation: float
+    pressure_msl: float
+    windspeed_10m: float
+    winddirection_10m: float
+    shortwave_radiation: float
+
+
+def fetch_air_quality_at_time(timestamp_utc: int, api_key: str,
                               lat: float, lon: float) -> dict:
     """Fetch air quality data with caching."""
-    cache_key = cache_manager._generate_key('air', timestamp_utc, lat, lon)
-
-    # Try cache first
-    cached = cache_manager.get(cache_key, CACHE_TTL_AIR)
+    # Try cache first (tuple key, single combined lookup)
+    cached = cache_manager.get_or_none('air', CACHE_TTL_AIR, timestamp_utc, lat, lon)
     if cached is not None:
         return cached
 
@@ -34,12 +81,24 @@ def fetch_air_quality_at_time(timestamp_utc: int, api_key: str,
     try:
         r = http_session.get(url, timeout=TIMEOUT)
         r.raise_for_status()
-        data = r.json()
+        data = _loads(r.content)
 
         if not data.get("list"):
             raise ValueError(f"No air quality data at timestamp {timestamp_utc}")
 
-        closest = min(data["list"], key=lambda x: abs(x["dt"] - timestamp_utc))
+        # Plain scan instead of min(key=lambda): the list is tiny (±10 min
+        # window) and this avoids a closure call per entry
+        closest = None
+        best_diff = None
+        for entry in data["list"]:
+            diff = entry["dt"] - timestamp_utc
+            if diff < 0:
+                diff = -diff
+            if best_diff is None or diff < best_diff:
+                best_diff = diff
+                closest = entry
+                if diff == 0:
+                    break
         result = {
             "co": closest["components"]["co"],
             "no": closest["components"]["no"],
@@ -52,7 +111,7 @@ def fetch_air_quality_at_time(timestamp_utc: int, api_key: str,
         }
 
         # Cache result
-        cache_manager.set(cache_key, result)
+        cache_manager.store('air', result, timestamp_utc, lat, lon)
         return result
 
     except Exception as e:
@@ -79,13 +138,47 @@ def fetch_weather_at_time(target_time_vn: datetime, lat: float, lon: float) -> d
         return fetch_weather_archive(target_time_vn, lat, lon)
 
 
+def _hourly_index(times: list, target_time_vn: datetime) -> tuple:
+    """
+    Locate the target hour in open-meteo's UTC hourly time list.
+
+    Both weather APIs are queried with timezone=UTC, so entries look like
+    "2024-11-29T07:00". An exact match is a single C-level list.index();
+    only on a miss do we parse timestamps to pick the closest hour.
+
+    Returns:
+        (index, diff_hours) — diff_hours is 0.0 for an exact match.
+    """
+    target_utc = target_time_vn.astimezone(timezone.utc)
+    target_iso = target_utc.strftime("%Y-%m-%dT%H:00")
+
+    try:
+        return times.index(target_iso), 0.0
+    except ValueError:
+        pass
+
+    target_naive = target_utc.replace(minute=0, second=0, microsecond=0,
+                                      tzinfo=None)
+    best_i = 0
+    best_diff = None
+    for i, t in enumerate(times):
+        diff = abs((datetime.fromisoformat(t) - target_naive).total_seconds())
+        if best_diff is None or diff < best_diff:
+            best_diff = diff
+            best_i = i
+
+    return best_i, best_diff / 3600
+
+
 def fetch_weather_archive(target_time_vn: datetime, lat: float, lon: float) -> dict:
     """Fetch PAST weather data from archive API."""
     day_str = target_time_vn.strftime("%Y-%m-%d")
-    cache_key = cache_manager._generate_key('weather_archive', day_str, lat, lon, target_time_vn.hour)
 
-    # Try cache first
-    cached = cache_manager.get(cache_key, CACHE_TTL_WEATHER)
+    # Try cache first (tuple key, single combined lookup)
+    cached = cache_manager.get_or_none(
+        'weather_archive', CACHE_TTL_WEATHER_ARCHIVE, day_str, lat, lon,
+        target_time_vn.hour
+    )
     if cached is not None:
         return cached
 
@@ -104,54 +197,38 @@ def fetch_weather_archive(target_time_vn: datetime, lat: float, lon: float) -> d
     try:
         r = http_session.get(url, params=params, timeout=TIMEOUT)
         r.raise_for_status()
-        data = r.json()
+        data = _loads(r.content)
 
         hourly_data = data.get("hourly", {})
-        if not hourly_data:
+        times = hourly_data.get("time", [])
+        if not times:
             raise ValueError("No weather data available")
 
-        df = pd.DataFrame(hourly_data)
-        df["time"] = pd.to_datetime(df["time"])
-        
-        # ✅ FIX: API returns UTC, localize then convert to VN timezone
-        df["time"] = df["time"].dt.tz_localize("UTC").dt.tz_convert(TZ_VN)
-        
-        target_hour = target_time_vn.replace(minute=0, second=0, microsecond=0)
-        
-        # Debug logging
-        logger.debug(f"🔍 Archive API - Target: {target_hour}")
-        logger.debug(f"   Available times: {df['time'].tolist()[:3]} ... {df['time'].tolist()[-3:]}")
-        
-        matched = df[df["time"] == target_hour]
-
-        if matched.empty:
-            # Try to find closest hour
-            df["time_diff"] = abs((df["time"] - target_hour).dt.total_seconds())
-            closest_idx = df["time_diff"].idxmin()
-            row = df.loc[closest_idx]
-            closest_time = row["time"]
-            time_diff_hours = abs((closest_time - target_hour).total_seconds()) / 3600
-            
+        # ✅ API returns UTC hourly lists; index directly, no DataFrame
+        logger.debug(f"🔍 Archive API - Target: {target_time_vn}")
+        idx, diff_hours = _hourly_index(times, target_time_vn)
+
+        if diff_hours:
             logger.warning(
-                f"⚠️  No exact match for {target_hour}. "
-                f"Using closest: {closest_time} (diff: {time_diff_hours:.1f}h)"
+                f"⚠️  No exact match for {target_time_vn}. "
+                f"Using closest: {times[idx]} UTC (diff: {diff_hours:.1f}h)"
             )
         else:
-            row = matched.iloc[0]
-            logger.debug(f"✅ Found exact match for {target_hour}")
+            logger.debug(f"✅ Found exact match for {target_time_vn}")
 
         result = {
-            "temperature_2m": float(row["temperature_2m"]),
-            "relative_humidity_2m": float(row["relative_humidity_2m"]),
-            "precipitation": float(row["precipitation"]),
-            "pressure_msl": float(row["pressure_msl"]),
-            "windspeed_10m": float(row["windspeed_10m"]),
-            "winddirection_10m": float(row["winddirection_10m"]),
-            "shortwave_radiation": float(row["shortwave_radiation"])
+            "temperature_2m": float(hourly_data["temperature_2m"][idx]),
+            "relative_humidity_2m": float(hourly_data["relative_humidity_2m"][idx]),
+            "precipitation": float(hourly_data["precipitation"][idx]),
+            "pressure_msl": float(hourly_data["pressure_msl"][idx]),
+            "windspeed_10m": float(hourly_data["windspeed_10m"][idx]),
+            "winddirection_10m": float(hourly_data["winddirection_10m"][idx]),
+            "shortwave_radiation": float(hourly_data["shortwave_radiation"][idx])
         }
 
         # Cache result
-        cache_manager.set(cache_key, result)
+        cache_manager.store('weather_archive', result, day_str, lat, lon,
+                            target_time_vn.hour)
         return result
 
     except Exception as e:
@@ -161,14 +238,11 @@ def fetch_weather_archive(target_time_vn: datetime, lat: float, lon: float) -> d
 
 def fetch_weather_forecast(target_time_vn: datetime, lat: float, lon: float) -> dict:
     """Fetch CURRENT/FUTURE weather data from forecast API."""
-    cache_key = cache_manager._generate_key(
-        'weather_forecast', 
-        target_time_vn.strftime("%Y-%m-%d-%H"), 
-        lat, lon
-    )
+    hour_str = target_time_vn.strftime("%Y-%m-%d-%H")
 
-    # Try cache first (shorter TTL for forecast)
-    cached = cache_manager.get(cache_key, 1800)  # 30 min cache for forecast
+    # Try cache first (shorter TTL for forecast; tuple key)
+    cached = cache_manager.get_or_none('weather_forecast', CACHE_TTL_WEATHER_FORECAST,
+                                       hour_str, lat, lon)
     if cached is not None:
         return cached
 
@@ -185,54 +259,40 @@ def fetch_weather_forecast(target_time_vn: datetime, lat: float, lon: float) ->
     try:
         r = http_session.get(url, params=params, timeout=TIMEOUT)
         r.raise_for_status()
-        data = r.json()
+        data = _loads(r.content)
 
         hourly_data = data.get("hourly", {})
-        if not hourly_data:
+        times = hourly_data.get("time", [])
+        if not times:
             raise ValueError("No forecast weather data available")
 
-        df = pd.DataFrame(hourly_data)
-        df["time"] = pd.to_datetime(df["time"])
-        
-        # ✅ API returns UTC, localize then convert to VN timezone
-        df["time"] = df["time"].dt.tz_localize("UTC").dt.tz_convert(TZ_VN)
-        
-        target_hour = target_time_vn.replace(minute=0, second=0, microsecond=0)
-        
-        # Debug logging
-        logger.debug(f"🔍 Forecast API - Target: {target_hour}")
-        logger.debug(f"   Available times: {df['time'].tolist()[:5]}")
-        
-        matched = df[df["time"] == target_hour]
-
-        if matched.empty:
-            # Try to find closest hour
-            df["time_diff"] = abs((df["time"] - target_hour).dt.total_seconds())
-            closest_idx = df["time_diff"].idxmin()
-            row = df.loc[closest_idx]
-            closest_time = row["time"]
-            time_diff_hours = abs((closest_time - target_hour).total_seconds()) / 3600
-            
+        # ✅ API returns UTC hourly lists; index directly, no DataFrame
+        logger.debug(f"🔍 Forecast API - Target: {target_time_vn}")
+        idx, diff_hours = _hourly_index(times, target_time_vn)
+
+        if diff_hours:
             logger.warning(
-                f"⚠️  Forecast: No exact match for {target_hour}. "
-                f"Using closest: {closest_time} (diff: {time_diff_hours:.1f}h)"
+                f"⚠️  Forecast: No exact match for {target_time_vn}. "
+                f"Using closest: {times[idx]} UTC (diff: {diff_hours:.1f}h)"
             )
         else:
-            row = matched.iloc[0]
-            logger.debug(f"✅ Forecast: Found exact match for {target_hour}")
+            logger.debug(f"✅ Forecast: Found exact match for {target_time_vn}")
 
         # ✅ Handle both field name variations (wind_speed_10m vs windspeed_10m)
+        wind_speed = hourly_data.get("wind_speed_10m") or hourly_data.get("windspeed_10m")
+        wind_dir = hourly_data.get("wind_direction_10m") or hourly_data.get("winddirection_10m")
+
         result = {
-            "temperature_2m": float(row["temperature_2m"]),
-            "relative_humidity_2m": float(row["relative_humidity_2m"]),
-            "precipitation": float(row["precipitation"]),
-            "pressure_msl": float(row["pressure_msl"]),
-            "windspeed_10m": float(row.get("wind_speed_10m", row.get("windspeed_10m", 0))),
-            "winddirection_10m": float(row.get("wind_direction_10m", row.get("winddirection_10m", 0))),
-            "shortwave_radiation": float(row["shortwave_radiation"])
+            "temperature_2m": float(hourly_data["temperature_2m"][idx]),
+            "relative_humidity_2m": float(hourly_data["relative_humidity_2m"][idx]),
+            "precipitation": float(hourly_data["precipitation"][idx]),
+            "pressure_msl": float(hourly_data["pressure_msl"][idx]),
+            "windspeed_10m": float(wind_speed[idx]) if wind_speed else 0.0,
+            "winddirection_10m": float(wind_dir[idx]) if wind_dir else 0.0,
+            "shortwave_radiation": float(hourly_data["shortwave_radiation"][idx])
         }
 
-        cache_manager.set(cache_key, result)
+        cache_manager.store('weather_forecast', result, hour_str, lat, lon)
         return result
 
     except Exception as e:
@@ -240,13 +300,21 @@ def fetch_weather_forecast(target_time_vn: datetime, lat: float, lon: float) ->
         raise
 
 
-def get_15_features_at_time(target_time_vn: datetime, api_key: str, 
-                           lat: float, lon: float) -> dict:
+def get_15_features_at_time(target_time_vn: datetime, api_key: str,
+                           lat: float, lon: float) -> RawFeatures:
     """Get 15 raw features (8 air + 7 weather) at specific time."""
-    target_utc = target_time_vn.astimezone(pytz.UTC)
+    target_utc = target_time_vn.astimezone(timezone.utc)
     timestamp_utc = int(target_utc.timestamp())
-    
-    air_data = fetch_air_quality_at_time(timestamp_utc, api_key, lat, lon)
-    weather_data = fetch_weather_at_time(target_time_vn, lat, lon)
-    
-    return {"datetime": target_time_vn, **air_data, **weather_data}
\ No newline at end of file
+
+    # Air and weather hit independent APIs — fetch both concurrently
+    air_future = _api_executor.submit(
+        fetch_air_quality_at_time, timestamp_utc, api_key, lat, lon
+    )
+    weather_future = _api_executor.submit(
+        fetch_weather_at_time, target_time_vn, lat, lon
+    )
+
+    air_data = air_future.result()
+    weather_data = weather_future.result()
+
+    return RawFeatures(target_time_vn, **air_data, **weather_data)
\ No newline at end of file
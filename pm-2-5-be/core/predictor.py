@@ -1,33 +1,100 @@
 """
 PM2.5 Prediction logic với detailed logging (NO AQI)
 """
-import pandas as pd
 from datetime import datetime, timedelta
-import traceback
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import numpy as np
 from core.data_fetcher import get_15_features_at_time
 from core.feature_engineering import create_features_from_3hours
+from core._feature_kernel import FEATURE_ORDER
 from utils.logger import main_logger as logger, pm25_logger
-from config.settings import TZ_VN
+from config.settings import TZ_VN, MAX_WORKERS
 
+# Shared pool for the t-2/t-1/t-0 fetch fan-out. Module-level so threads
+# are reused across requests; distinct from the per-district pool in the
+# API layer, so tasks never submit back into their own pool.
+_fetch_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
 
-def predict_pm25_for_district(district: dict, year: int, month: int, day: int,
-                              hour: int, minute: int, api_key: str,
-                              model, scaler, feature_columns: list,
-                              include_raw_data: bool = True) -> dict:
+
+class OnnxModel:
     """
-    Predict PM2.5 for one district with detailed PM2.5 logging.
-    
-    Args:
-        district: District information dict
-        year, month, day, hour, minute: Target time
-        api_key: OpenWeather API key
-        model: Trained model
-        scaler: Feature scaler
-        feature_columns: List of feature column names
-        include_raw_data: Whether to include raw 15 features in response
-    
+    predict()-compatible wrapper around an ONNX Runtime session.
+
+    ONNX Runtime runs tree-ensemble inference in C++ (SIMD kernels) and
+    releases the GIL, so batched predicts overlap with request threads.
+    Exported offline via skl2onnx; only used when the .onnx artifact and
+    the onnxruntime package are both present.
+    """
+    __slots__ = ('session', 'input_name')
+
+    def __init__(self, model_path: str):
+        import onnxruntime as ort
+        self.session = ort.InferenceSession(
+            model_path, providers=['CPUExecutionProvider']
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        return self.session.run(None, {self.input_name: X})[0].ravel()
+
+
+class InlineScaler:
+    """
+    Drop-in replacement for StandardScaler on the predict hot path.
+
+    Precomputes mean_ and 1/scale_ as float32 at startup, so each
+    transform is one subtract and one multiply over the row — skipping
+    sklearn's check_array/_validate_data stack, which dominates the cost
+    for 1x40 inputs. Keeps the .transform interface so call sites and
+    health checks are unchanged.
+    """
+    __slots__ = ('mean_', 'inv_scale_')
+
+    def __init__(self, scaler):
+        self.mean_ = scaler.mean_.astype(np.float32)
+        self.inv_scale_ = (1.0 / scaler.scale_).astype(np.float32)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return (X - self.mean_) * self.inv_scale_
+
+
+def _error_result(district: dict, error: Exception) -> dict:
+    """Build standardized error result for one district."""
+    error_type = type(error).__name__
+    error_msg = str(error)
+
+    # ✅ LOG: Error — logger.exception attaches exc_info and lets the
+    # handler format the traceback, instead of walking the stack eagerly
+    pm25_logger.log_error(district.get('name', 'Unknown'), f"{error_type}: {error_msg}")
+    logger.exception(f"❌ {district.get('name', 'Unknown')}: {error_type}: {error_msg}")
+
+    return {
+        "id": district['id'],
+        "name": district['name'],
+        "name_en": district['name_en'],
+        "lat": district['lat'],
+        "lon": district['lon'],
+        "status": "error",
+        "error": error_msg,
+        "error_type": error_type
+    }
+
+
+def build_features_for_district(district: dict, year: int, month: int, day: int,
+                                hour: int, minute: int, api_key: str,
+                                feature_columns: list) -> dict:
+    """
+    Fetch 3 hours of data and build the model feature row for one district.
+
+    This is the I/O + feature-engineering half of a prediction; the model
+    call itself is done by the caller so it can be batched across requests.
+
     Returns:
-        dict: Prediction result with status
+        dict: {"status": "success", "features": (1, n_features) array,
+               "features_t0": raw features at t-0}
+              or the standard error result dict on failure.
     """
     district_name = district.get('name', 'Unknown')
     district_id = district.get('id', 'Unknown')
@@ -35,119 +102,174 @@ def predict_pm25_for_district(district: dict, year: int, month: int, day: int,
     try:
         # LOG: Request
         pm25_logger.log_request(district_id, district_name, year, month, day, hour, minute)
-        logger.debug(f"🔄 Predicting for {district_name} (ID: {district_id})")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"🔄 Building features for {district_name} (ID: {district_id})")
 
         # ✅ FIX: Get all 3 timestamps CLEARLY
-        target_time = TZ_VN.localize(datetime(year, month, day, hour, minute))
+        target_time = datetime(year, month, day, hour, minute, tzinfo=TZ_VN)
         time_t1 = target_time - timedelta(hours=1)
         time_t2 = target_time - timedelta(hours=2)
 
-        # ✅ FIX: Get features for ALL 3 times in correct order
-        logger.debug(f"  Fetching t-2: {time_t2.strftime('%Y-%m-%d %H:%M')}")
-        features_t2 = get_15_features_at_time(time_t2, api_key, district['lat'], district['lon'])
-        
-        logger.debug(f"  Fetching t-1: {time_t1.strftime('%Y-%m-%d %H:%M')}")
-        features_t1 = get_15_features_at_time(time_t1, api_key, district['lat'], district['lon'])
-        
-        logger.debug(f"  Fetching t-0: {target_time.strftime('%Y-%m-%d %H:%M')}")
-        features_t0 = get_15_features_at_time(target_time, api_key, district['lat'], district['lon'])
+        # ✅ FIX: Get features for ALL 3 times in correct order — fetched
+        # concurrently so wall time is ~one round-trip instead of three
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"  Fetching t-2/t-1/t-0 up to {target_time.strftime('%Y-%m-%d %H:%M')}")
+        features_t2, features_t1, features_t0 = _fetch_executor.map(
+            lambda t: get_15_features_at_time(t, api_key, district['lat'], district['lon']),
+            (time_t2, time_t1, target_time)
+        )
 
         # ✅ LOG: Raw PM2.5 values
         pm25_logger.log_raw_pm25(
             district_name,
             target_time.strftime('%Y-%m-%d %H:%M'),
-            features_t2['pm2_5'],
-            features_t1['pm2_5'],
-            features_t0['pm2_5']
+            features_t2.pm2_5,
+            features_t1.pm2_5,
+            features_t0.pm2_5
         )
 
-        # ✅ FIX: Create DataFrame with correct order
-        df_3hours = pd.DataFrame([features_t2, features_t1, features_t0])
-        df_3hours = df_3hours.set_index("datetime").sort_index()
-        
-        # Verify we have 3 rows
-        if len(df_3hours) != 3:
-            raise ValueError(f"Expected 3 hours of data, got {len(df_3hours)}")
-        
-        logger.debug(f"  DataFrame shape: {df_3hours.shape}")
-        logger.debug(f"  PM2.5 sequence (t-2, t-1, t-0): {df_3hours['pm2_5'].tolist()}")
-
-        # Create 40 features
-        df_features = create_features_from_3hours(df_3hours)
-        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"  PM2.5 sequence (t-2, t-1, t-0): "
+                         f"[{features_t2.pm2_5}, {features_t1.pm2_5}, {features_t0.pm2_5}]")
+
+        # Create 40 features via the numeric kernel (JIT-compiled when
+        # numba is available) — no per-request DataFrame construction
+        row = create_features_from_3hours(features_t2, features_t1, features_t0, feature_columns)
+
         # ✅ LOG: Key engineered features
-        features_dict = df_features.iloc[0].to_dict()
+        names = feature_columns if feature_columns else FEATURE_ORDER
+        features_dict = dict(zip(names, row))
         pm25_logger.log_features(district_name, features_dict)
 
-        if feature_columns:
-            df_features = df_features[feature_columns]
+        return {
+            "status": "success",
+            "features": row.reshape(1, -1),
+            "features_t0": features_t0
+        }
 
-        # Scale and predict
-        X_scaled = scaler.transform(df_features)
-        prediction = float(model.predict(X_scaled)[0])
+    except Exception as e:
+        return _error_result(district, e)
+
+
+def finalize_prediction_result(district: dict, prediction: float, features_t0,
+                               include_raw_data: bool = True) -> dict:
+    """Build the per-district result dict from a model prediction."""
+    district_name = district.get('name', 'Unknown')
 
-        # ✅ LOG: Prediction result
-        pm25_logger.log_prediction(district_name, prediction, features_t0['pm2_5'])
+    # ✅ LOG: Prediction result
+    pm25_logger.log_prediction(district_name, prediction, features_t0.pm2_5)
+    if logger.isEnabledFor(logging.DEBUG):
         logger.debug(f"✅ {district_name}: PM2.5={prediction:.2f} μg/m³")
 
-        result = {
-            "id": district['id'],
-            "name": district['name'],
-            "name_en": district['name_en'],
-            "lat": district['lat'],
-            "lon": district['lon'],
-            "pm25_prediction": round(prediction, 2),
-            "population": district['population'],
-            "area_km2": district['area_km2'],
-            "type": district['type'],
-            "status": "success"
-        }
+    result = {
+        "id": district['id'],
+        "name": district['name'],
+        "name_en": district['name_en'],
+        "lat": district['lat'],
+        "lon": district['lon'],
+        "pm25_prediction": round(prediction, 2),
+        "population": district['population'],
+        "area_km2": district['area_km2'],
+        "type": district['type'],
+        "status": "success"
+    }
 
-        # ✅ Include 15 raw features from t=0
-        if include_raw_data:
-            result["raw_data"] = {
-                "timestamp": features_t0['datetime'].isoformat(),
-                # Air quality data (8 fields)
-                "air_quality": {
-                    "co": round(float(features_t0['co']), 2),
-                    "no": round(float(features_t0['no']), 2),
-                    "no2": round(float(features_t0['no2']), 2),
-                    "o3": round(float(features_t0['o3']), 2),
-                    "so2": round(float(features_t0['so2']), 2),
-                    "pm2_5": round(float(features_t0['pm2_5']), 2),
-                    "pm10": round(float(features_t0['pm10']), 2),
-                    "nh3": round(float(features_t0['nh3']), 2)
-                },
-                # Weather data (7 fields)
-                "weather": {
-                    "temperature_2m": round(float(features_t0['temperature_2m']), 2),
-                    "relative_humidity_2m": round(float(features_t0['relative_humidity_2m']), 2),
-                    "precipitation": round(float(features_t0['precipitation']), 2),
-                    "pressure_msl": round(float(features_t0['pressure_msl']), 2),
-                    "windspeed_10m": round(float(features_t0['windspeed_10m']), 2),
-                    "winddirection_10m": round(float(features_t0['winddirection_10m']), 2),
-                    "shortwave_radiation": round(float(features_t0['shortwave_radiation']), 2)
-                }
+    # ✅ Include 15 raw features from t=0
+    if include_raw_data:
+        result["raw_data"] = {
+            "timestamp": features_t0.datetime.isoformat(),
+            # Air quality data (8 fields)
+            "air_quality": {
+                "co": round(float(features_t0.co), 2),
+                "no": round(float(features_t0.no), 2),
+                "no2": round(float(features_t0.no2), 2),
+                "o3": round(float(features_t0.o3), 2),
+                "so2": round(float(features_t0.so2), 2),
+                "pm2_5": round(float(features_t0.pm2_5), 2),
+                "pm10": round(float(features_t0.pm10), 2),
+                "nh3": round(float(features_t0.nh3), 2)
+            },
+            # Weather data (7 fields)
+            "weather": {
+                "temperature_2m": round(float(features_t0.temperature_2m), 2),
+                "relative_humidity_2m": round(float(features_t0.relative_humidity_2m), 2),
+                "precipitation": round(float(features_t0.precipitation), 2),
+                "pressure_msl": round(float(features_t0.pressure_msl), 2),
+                "windspeed_10m": round(float(features_t0.windspeed_10m), 2),
+                "winddirection_10m": round(float(features_t0.winddirection_10m), 2),
+                "shortwave_radiation": round(float(features_t0.shortwave_radiation), 2)
             }
+        }
 
-        return result
+    return result
 
-    except Exception as e:
-        error_type = type(e).__name__
-        error_msg = str(e)
-        
-        # ✅ LOG: Error
-        pm25_logger.log_error(district_name, f"{error_type}: {error_msg}")
-        logger.error(f"❌ {district_name}: {error_type}: {error_msg}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
 
-        return {
-            "id": district['id'],
-            "name": district['name'],
-            "name_en": district['name_en'],
-            "lat": district['lat'],
-            "lon": district['lon'],
-            "status": "error",
-            "error": error_msg,
-            "error_type": error_type
-        }
\ No newline at end of file
+def predict_pm25_batch(built_ok: list, model, scaler,
+                       include_raw_data: bool = True) -> list:
+    """
+    Run one batched model call for many districts' prebuilt feature rows.
+
+    Args:
+        built_ok: List of (district, built) pairs, where built is the
+                  success dict from build_features_for_district()
+        model: Trained model
+        scaler: Feature scaler
+        include_raw_data: Whether to include raw 15 features per result
+
+    Returns:
+        list: Per-district result dicts in the same order as built_ok.
+
+    Stacking rows into one (N, 40) matrix means a single
+    scaler.transform/model.predict pair instead of N boundary crossings
+    into sklearn, letting the ensemble traverse contiguous arrays.
+    """
+    if not built_ok:
+        return []
+
+    X = np.vstack([built['features'] for _, built in built_ok])
+    predictions = model.predict(scaler.transform(X))
+
+    return [
+        finalize_prediction_result(
+            district, float(prediction), built['features_t0'], include_raw_data
+        )
+        for (district, built), prediction in zip(built_ok, predictions)
+    ]
+
+
+def predict_pm25_for_district(district: dict, year: int, month: int, day: int,
+                              hour: int, minute: int, api_key: str,
+                              model, scaler, feature_columns: list,
+                              include_raw_data: bool = True) -> dict:
+    """
+    Predict PM2.5 for one district with detailed PM2.5 logging.
+
+    Args:
+        district: District information dict
+        year, month, day, hour, minute: Target time
+        api_key: OpenWeather API key
+        model: Trained model
+        scaler: Feature scaler
+        feature_columns: List of feature column names
+        include_raw_data: Whether to include raw 15 features in response
+
+    Returns:
+        dict: Prediction result with status
+    """
+    built = build_features_for_district(
+        district, year, month, day, hour, minute, api_key, feature_columns
+    )
+    if built['status'] == 'error':
+        return built
+
+    try:
+        # Scale and predict
+        X_scaled = scaler.transform(built['features'])
+        prediction = float(model.predict(X_scaled)[0])
+
+        return finalize_prediction_result(
+            district, prediction, built['features_t0'], include_raw_data
+        )
+
+    except Exception as e:
+        return _error_result(district, e)
@@ -0,0 +1,32 @@
+"""
+Gunicorn configuration for the PM2.5 API.
+
+The service is network-bound: every uncached prediction fans out to the
+OpenWeather/open-meteo APIs. gevent workers multiplex those outbound
+calls on an event loop, so a few processes sustain far more in-flight
+requests than the single-process Flask dev server. Gunicorn's gevent
+worker monkey-patches the stdlib at fork, which makes the pooled
+requests session in utils/http_session non-blocking.
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5001')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '4'))
+worker_class = 'gevent'
+worker_connections = 1000
+timeout = 60
+# NO preload: create_app() starts background threads (the batched
+# predictor's consumer, the log QueueListeners) which would not survive
+# fork() — with preload they'd run only in the master and every worker
+# would enqueue into queues nobody drains. gevent's monkey-patching also
+# has to happen before the app imports threading/socket-heavy modules,
+# which preload breaks. Model pages are still shared across workers:
+# joblib mmap_mode='r' maps the same file, so the OS page cache backs
+# all processes with one copy.
+preload_app = False
+# Model/scaler load happens per worker (create_app in wsgi.py), so give
+# slow cold starts some headroom before gunicorn kills the worker
+graceful_timeout = 60
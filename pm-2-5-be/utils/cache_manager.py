@@ -2,73 +2,116 @@
 Cache management system
 """
 import time
-import hashlib
+from collections import OrderedDict
 from typing import Optional
 from utils.logger import main_logger as logger
+from config.settings import (
+    REDIS_URL, REDIS_PREDICTION_PREFIX, MAX_PREDICTION_CACHE_SIZE
+)
+
+# Optional dependencies for the L2 (Redis) prediction cache tier
+try:
+    import orjson
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _dumps = lambda obj: json.dumps(obj).encode()
+    _loads = json.loads
+
+try:
+    import redis as _redis
+except ImportError:
+    _redis = None
 
 class CacheManager:
-    """Advanced cache manager with TTL and LRU eviction."""
+    """Advanced cache manager with TTL and O(1) LRU eviction."""
+    __slots__ = ('cache', 'max_size')
 
     def __init__(self, max_size: int = 2000):
-        self.cache = {}
-        self.timestamps = {}
-        self.access_count = {}
+        # key -> (value, stored_at); the OrderedDict's order IS the LRU
+        # order, so eviction is popitem(last=False) instead of a scan
+        self.cache = OrderedDict()
         self.max_size = max_size
 
-    def _generate_key(self, *args, **kwargs) -> str:
-        """Generate cache key."""
-        key_data = str(args) + str(sorted(kwargs.items()))
-        return hashlib.md5(key_data.encode()).hexdigest()
+    def _generate_key(self, *args, **kwargs) -> tuple:
+        """
+        Generate cache key.
+
+        A plain tuple: dicts hash it natively (SipHash, tens of ns),
+        where the old md5 hexdigest cost microseconds plus two string
+        allocations per lookup — and this is a local cache with no
+        adversarial keys to defend against.
+        """
+        if kwargs:
+            return (*args, tuple(sorted(kwargs.items())))
+        return args
+
+    def get_or_none(self, kind: str, ttl: int, *parts):
+        """
+        Combined key build + lookup + freshness check.
+
+        Uses a plain tuple (kind, *parts) as the key — tuples hash
+        directly, so the hot path skips string formatting and md5 work,
+        and one call replaces the _generate_key/get pair. Freshness uses
+        the monotonic clock so wall-clock jumps can't expire entries.
+        """
+        key = (kind, *parts)
+        entry = self.cache.get(key)
+        if entry is None:
+            logger.debug(f"❌ Cache MISS: {key}")
+            return None
+
+        value, stored_at = entry
+        if time.monotonic() - stored_at < ttl:
+            self.cache.move_to_end(key)
+            logger.debug(f"✅ Cache HIT: {key}")
+            return value
 
-    def get(self, key: str, ttl: int) -> Optional[any]:
+        del self.cache[key]
+        logger.debug(f"⏰ Cache EXPIRED: {key}")
+        return None
+
+    def store(self, kind: str, value, *parts):
+        """Store a value under the same tuple key get_or_none() builds."""
+        key = (kind, *parts)
+        self.cache[key] = (value, time.monotonic())
+        self.cache.move_to_end(key)
+
+        if len(self.cache) > self.max_size:
+            evicted_key, _ = self.cache.popitem(last=False)
+            logger.debug(f"🗑️  Cache EVICT: {evicted_key}")
+
+    def get(self, key, ttl: int) -> Optional[any]:
         """Get cached value if exists and not expired."""
-        if key in self.cache:
-            timestamp = self.timestamps.get(key, 0)
-            if time.time() - timestamp < ttl:
-                self.access_count[key] = self.access_count.get(key, 0) + 1
-                logger.debug(f"✅ Cache HIT: {key[:20]}...")
-                return self.cache[key]
-            else:
-                # Expired
-                self._remove(key)
-                logger.debug(f"⏰ Cache EXPIRED: {key[:20]}...")
-
-        logger.debug(f"❌ Cache MISS: {key[:20]}...")
+        entry = self.cache.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            if time.monotonic() - stored_at < ttl:
+                self.cache.move_to_end(key)
+                logger.debug(f"✅ Cache HIT: {key}")
+                return value
+            # Expired
+            del self.cache[key]
+            logger.debug(f"⏰ Cache EXPIRED: {key}")
+            return None
+
+        logger.debug(f"❌ Cache MISS: {key}")
         return None
 
-    def set(self, key: str, value: any):
+    def set(self, key, value: any):
         """Set cache value."""
-        # Clean if too large
-        if len(self.cache) >= self.max_size:
-            self._evict_lru()
-
-        self.cache[key] = value
-        self.timestamps[key] = time.time()
-        self.access_count[key] = 0
-
-    def _remove(self, key: str):
-        """Remove a cache entry."""
-        self.cache.pop(key, None)
-        self.timestamps.pop(key, None)
-        self.access_count.pop(key, None)
-
-    def _evict_lru(self):
-        """Evict least recently used entry."""
-        if not self.cache:
-            return
-
-        # Find least accessed and oldest
-        lru_key = min(self.timestamps.items(), 
-                     key=lambda x: (self.access_count.get(x[0], 0), x[1]))[0]
-        logger.debug(f"🗑️  Cache EVICT: {lru_key[:20]}...")
-        self._remove(lru_key)
+        self.cache[key] = (value, time.monotonic())
+        self.cache.move_to_end(key)
+
+        if len(self.cache) > self.max_size:
+            evicted_key, _ = self.cache.popitem(last=False)
+            logger.debug(f"🗑️  Cache EVICT: {evicted_key}")
 
     def clear(self):
         """Clear all cache."""
         count = len(self.cache)
         self.cache.clear()
-        self.timestamps.clear()
-        self.access_count.clear()
         logger.info(f"🗑️  Cache cleared: {count} entries removed")
 
     def stats(self) -> dict:
@@ -81,49 +124,128 @@ class CacheManager:
 
 
 class PredictionCache:
-    """Cache for prediction results to reuse across endpoints."""
+    """
+    Tiered cache for prediction results to reuse across endpoints.
 
-    def __init__(self, ttl: int = 1800):
-        self.cache = {}
-        self.timestamps = {}
+    L1 is the in-process dict (fastest). When REDIS_URL is configured and
+    the redis package is available, an L2 Redis tier shares results across
+    workers/replicas so each (year, month, day, hour, minute) is computed once.
+    """
+    __slots__ = ('cache', 'ttl', 'max_size', 'redis')
+
+    def __init__(self, ttl: int = 1800, max_size: int = MAX_PREDICTION_CACHE_SIZE,
+                 redis_url: str = REDIS_URL):
+        # key -> (result, stored_at, entry_ttl); ordered so the LRU entry
+        # is always first and eviction is O(1) (same scheme as CacheManager)
+        self.cache = OrderedDict()
         self.ttl = ttl
+        self.max_size = max_size
+        self.redis = self._connect_redis(redis_url)
+
+    @staticmethod
+    def _connect_redis(redis_url: Optional[str]):
+        """Connect the optional L2 Redis tier (best-effort)."""
+        if not redis_url:
+            return None
+        if _redis is None:
+            logger.warning("⚠️  REDIS_URL set but redis package not installed, L2 cache disabled")
+            return None
+        try:
+            client = _redis.Redis.from_url(redis_url, socket_timeout=1)
+            client.ping()
+            logger.info("✅ Prediction cache L2 (Redis) connected")
+            return client
+        except Exception as e:
+            logger.warning(f"⚠️  Redis unavailable, prediction cache is L1-only: {e}")
+            return None
 
-    def _generate_key(self, year: int, month: int, day: int, 
-                     hour: int, minute: int = 0) -> str:
-        """Generate prediction cache key."""
-        return f"pred_{year}_{month}_{day}_{hour}_{minute}"
+    def _generate_key(self, year: int, month: int, day: int,
+                     hour: int, minute: int = 0) -> tuple:
+        """Generate prediction cache key (plain tuple, hashes natively)."""
+        return (year, month, day, hour, minute)
 
-    def get(self, year: int, month: int, day: int, 
+    def _redis_key(self, year: int, month: int, day: int,
+                   hour: int, minute: int = 0) -> str:
+        """Stable L2 key shared across all workers/replicas."""
+        return f"{REDIS_PREDICTION_PREFIX}:{year}:{month:02d}:{day:02d}:{hour:02d}:{minute:02d}"
+
+    def get(self, year: int, month: int, day: int,
            hour: int, minute: int = 0) -> Optional[dict]:
-        """Get cached prediction result."""
+        """Get cached prediction result (L1 first, then L2)."""
         key = self._generate_key(year, month, day, hour, minute)
 
-        if key in self.cache:
-            timestamp = self.timestamps.get(key, 0)
-            if time.time() - timestamp < self.ttl:
+        entry = self.cache.get(key)
+        if entry is not None:
+            result, stored_at, entry_ttl = entry
+            if time.monotonic() - stored_at < entry_ttl:
+                self.cache.move_to_end(key)
                 logger.info(f"🎯 PREDICTION CACHE HIT for {year}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}")
-                return self.cache[key]
-            else:
-                # Expired
-                del self.cache[key]
-                del self.timestamps[key]
+                return result
+            # Expired
+            del self.cache[key]
+
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(self._redis_key(year, month, day, hour, minute))
+                if raw is not None:
+                    result = _loads(raw)
+                    # Promote to L1 for subsequent requests in this worker
+                    self._store_l1(key, result, self.ttl)
+                    logger.info(f"🎯 PREDICTION CACHE HIT (L2) for {year}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}")
+                    return result
+            except Exception as e:
+                logger.warning(f"⚠️  Redis get failed: {e}")
 
         logger.info(f"❌ PREDICTION CACHE MISS for {year}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}")
         return None
 
-    def set(self, year: int, month: int, day: int, 
-           hour: int, minute: int, result: dict):
-        """Set prediction result cache."""
+    def set(self, year: int, month: int, day: int,
+           hour: int, minute: int, result: dict, ttl: int = None):
+        """
+        Set prediction result cache in both tiers.
+
+        `ttl` overrides the default per entry — historical predictions are
+        immutable and can outlive the short default TTL.
+        """
+        entry_ttl = ttl if ttl is not None else self.ttl
         key = self._generate_key(year, month, day, hour, minute)
-        self.cache[key] = result
-        self.timestamps[key] = time.time()
-        logger.info(f"💾 PREDICTION CACHED for {year}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}")
+        self._store_l1(key, result, entry_ttl)
+
+        if self.redis is not None:
+            try:
+                self.redis.setex(
+                    self._redis_key(year, month, day, hour, minute),
+                    entry_ttl,
+                    _dumps(result)
+                )
+            except Exception as e:
+                logger.warning(f"⚠️  Redis set failed: {e}")
+
+        logger.info(f"💾 PREDICTION CACHED for {year}-{month:02d}-{day:02d} {hour:02d}:{minute:02d} (ttl {entry_ttl}s)")
+
+    def _store_l1(self, key: tuple, result: dict, entry_ttl: int):
+        """Insert into L1, evicting the least-recently-used entry if full."""
+        self.cache[key] = (result, time.monotonic(), entry_ttl)
+        self.cache.move_to_end(key)
+
+        if len(self.cache) > self.max_size:
+            evicted_key, _ = self.cache.popitem(last=False)
+            logger.debug(f"🗑️  Prediction cache EVICT: {evicted_key}")
 
     def clear(self):
-        """Clear prediction cache."""
+        """Clear prediction cache (both tiers)."""
         count = len(self.cache)
         self.cache.clear()
-        self.timestamps.clear()
+
+        if self.redis is not None:
+            try:
+                keys = list(self.redis.scan_iter(f"{REDIS_PREDICTION_PREFIX}:*"))
+                if keys:
+                    self.redis.delete(*keys)
+                    count += len(keys)
+            except Exception as e:
+                logger.warning(f"⚠️  Redis clear failed: {e}")
+
         logger.info(f"🗑️  Prediction cache cleared: {count} entries removed")
 
     def stats(self) -> dict:
@@ -131,5 +253,6 @@ class PredictionCache:
         return {
             "size": len(self.cache),
             "ttl": self.ttl,
+            "l2_redis": self.redis is not None,
             "keys": list(self.cache.keys())
         }
\ No newline at end of file
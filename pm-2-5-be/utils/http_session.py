@@ -1,5 +1,16 @@
 """
 HTTP session with retry mechanism
+
+All outbound weather/air-quality calls (core.data_fetcher, used by the
+predictor's per-district fan-out) share this single pooled session, so
+keep-alive connections are reused across ThreadPoolExecutor workers
+instead of paying TCP/TLS setup per call. Pool sizes are tied to
+MAX_WORKERS to cover the worst-case concurrent fan-out: per request up
+to MAX_WORKERS districts x 3 timestamps x 2 APIs can be in flight.
+
+Under gunicorn's gevent workers (see gunicorn.conf.py) the same session
+becomes non-blocking via monkey-patching, which gives event-loop I/O
+concurrency without moving the codebase to an async client/ASGI stack.
 """
 import requests
 from requests.adapters import HTTPAdapter
@@ -14,13 +25,18 @@ def create_session_with_retry() -> requests.Session:
         total=MAX_RETRIES,
         backoff_factor=BACKOFF_FACTOR,
         status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["HEAD", "GET", "OPTIONS"]
+        allowed_methods=["HEAD", "GET", "OPTIONS"],
+        # Hand the final bad response back instead of raising inside
+        # urllib3 — callers already do r.raise_for_status(), so this
+        # skips building/unwinding a MaxRetryError on exhausted retries
+        raise_on_status=False,
+        respect_retry_after_header=True
     )
     
     adapter = HTTPAdapter(
         max_retries=retry_strategy,
         pool_connections=MAX_WORKERS * 2,
-        pool_maxsize=MAX_WORKERS * 4
+        pool_maxsize=MAX_WORKERS * 6
     )
     
     session.mount("http://", adapter)
@@ -1,32 +1,83 @@
 """
 Logging utilities for PM2.5 API
 """
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 from datetime import datetime
 from config.settings import LOG_FILE_MAIN, LOG_FILE_PM25, LOG_LEVEL, LOG_FORMAT, TZ_VN
 
+# Rotate at 50 MB, keep 5 backups — the PM2.5 value log in particular
+# grows by several lines per district per prediction
+LOG_MAX_BYTES = 50_000_000
+LOG_BACKUP_COUNT = 5
+
+# Listener threads do not survive fork(). Normally each process imports
+# this module itself (gunicorn.conf.py sets preload_app=False), but if a
+# parent that already set up logging forks, restart the listeners in the
+# child so its queues keep draining instead of growing unbounded.
+_listeners = []
+
+
+def _restart_listeners_after_fork():
+    for listener in _listeners:
+        listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_listeners_after_fork)
+
+
+def _async_file_handler(log_file: str, formatter: logging.Formatter,
+                        level: int = logging.DEBUG) -> logging.Handler:
+    """
+    Build a queue-backed rotating file handler.
+
+    The calling thread only pays a queue put; a QueueListener thread
+    drains records to the RotatingFileHandler, so request threads never
+    block on the file lock or disk writes during prediction bursts.
+    Must be called in the process that will log — the listener thread is
+    per-process (see _restart_listeners_after_fork for the fork case).
+    """
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+        encoding='utf-8'
+    )
+    file_handler.setLevel(level)
+    file_handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(
+        log_queue, file_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    _listeners.append(listener)
+
+    return logging.handlers.QueueHandler(log_queue)
+
+
 # ==================== MAIN LOGGER ====================
 def setup_main_logger():
     """Setup main application logger."""
     logger = logging.getLogger('pm25_api')
     logger.setLevel(getattr(logging, LOG_LEVEL))
-    
+
     # Clear existing handlers
     logger.handlers.clear()
-    
-    # File handler
-    file_handler = logging.FileHandler(LOG_FILE_MAIN, encoding='utf-8')
-    file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
-    
+
+    # File handler (rotating, drained off-thread)
+    file_handler = _async_file_handler(LOG_FILE_MAIN, logging.Formatter(LOG_FORMAT))
+
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
-    
+
     logger.addHandler(file_handler)
     logger.addHandler(console_handler)
-    
+
     return logger
 
 # ==================== PM2.5 VALUES LOGGER ====================
@@ -38,11 +89,10 @@ class PM25Logger:
         self.logger.setLevel(logging.INFO)
         self.logger.handlers.clear()
         
-        # Dedicated file for PM2.5 values
-        handler = logging.FileHandler(LOG_FILE_PM25, encoding='utf-8')
-        handler.setFormatter(logging.Formatter(
-            '%(asctime)s | %(message)s'
-        ))
+        # Dedicated file for PM2.5 values (rotating, drained off-thread)
+        handler = _async_file_handler(
+            LOG_FILE_PM25, logging.Formatter('%(asctime)s | %(message)s')
+        )
         self.logger.addHandler(handler)
         
         # Also log to console for debugging
@@ -50,61 +100,65 @@ class PM25Logger:
         console.setFormatter(logging.Formatter('🔍 %(message)s'))
         self.logger.addHandler(console)
     
-    def log_request(self, district_id: int, district_name: str, year: int, month: int, 
+    def log_request(self, district_id: int, district_name: str, year: int, month: int,
                    day: int, hour: int, minute: int):
         """Log prediction request."""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         timestamp = datetime.now(TZ_VN).strftime('%Y-%m-%d %H:%M:%S')
         self.logger.info(
-            f"REQUEST | District: {district_name} (ID: {district_id}) | "
-            f"Target: {year}-{month:02d}-{day:02d} {hour:02d}:{minute:02d} | "
-            f"Time: {timestamp}"
+            "REQUEST | District: %s (ID: %s) | Target: %d-%02d-%02d %02d:%02d | Time: %s",
+            district_name, district_id, year, month, day, hour, minute, timestamp
         )
-    
-    def log_raw_pm25(self, district_name: str, timestamp: str, 
+
+    def log_raw_pm25(self, district_name: str, timestamp: str,
                      pm25_t2: float, pm25_t1: float, pm25_t0: float):
         """Log raw PM2.5 values from API (t-2, t-1, t-0)."""
+        # %-style args: the logging module defers formatting until a
+        # handler actually emits the record
         self.logger.info(
-            f"PM25_RAW | {district_name} | {timestamp} | "
-            f"t-2: {pm25_t2:.2f} | t-1: {pm25_t1:.2f} | t-0: {pm25_t0:.2f}"
+            "PM25_RAW | %s | %s | t-2: %.2f | t-1: %.2f | t-0: %.2f",
+            district_name, timestamp, pm25_t2, pm25_t1, pm25_t0
         )
-    
+
     def log_features(self, district_name: str, features_dict: dict):
         """Log key engineered features."""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         pm25_lag1 = features_dict.get('pm2_5_lag_1', 'N/A')
         pm25_lag2 = features_dict.get('pm2_5_lag_2', 'N/A')
         pm25_roll_avg = features_dict.get('pm2_5_roll_avg_3hr', 'N/A')
         pm25_diff = features_dict.get('pm2_5_diff_1hr', 'N/A')
-        
+
         self.logger.info(
             f"PM25_FEATURES | {district_name} | "
             f"lag1: {pm25_lag1:.2f} | lag2: {pm25_lag2:.2f} | "
             f"roll_avg_3hr: {pm25_roll_avg:.2f} | diff_1hr: {pm25_diff:.2f}"
         )
-    
-    def log_prediction(self, district_name: str, predicted_pm25: float, 
+
+    def log_prediction(self, district_name: str, predicted_pm25: float,
                       actual_pm25_t0: float):
         """Log final prediction vs actual current PM2.5."""
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
         diff = predicted_pm25 - actual_pm25_t0
         diff_percent = (diff / actual_pm25_t0 * 100) if actual_pm25_t0 > 0 else 0
-        
+
         self.logger.info(
-            f"PM25_PREDICTION | {district_name} | "
-            f"Predicted: {predicted_pm25:.2f} | Actual(t-0): {actual_pm25_t0:.2f} | "
-            f"Diff: {diff:+.2f} ({diff_percent:+.1f}%)"
+            "PM25_PREDICTION | %s | Predicted: %.2f | Actual(t-0): %.2f | Diff: %+.2f (%+.1f%%)",
+            district_name, predicted_pm25, actual_pm25_t0, diff, diff_percent
         )
-    
+
     def log_error(self, district_name: str, error: str):
         """Log prediction error."""
-        self.logger.error(
-            f"PM25_ERROR | {district_name} | {error}"
-        )
-    
-    def log_summary(self, total: int, success: int, failed: int, 
+        self.logger.error("PM25_ERROR | %s | %s", district_name, error)
+
+    def log_summary(self, total: int, success: int, failed: int,
                    avg_pm25: float, execution_time: float):
         """Log batch prediction summary."""
         self.logger.info(
-            f"PM25_SUMMARY | Total: {total} | Success: {success} | Failed: {failed} | "
-            f"Avg PM2.5: {avg_pm25:.2f} | Time: {execution_time:.2f}s"
+            "PM25_SUMMARY | Total: %d | Success: %d | Failed: %d | Avg PM2.5: %.2f | Time: %.2fs",
+            total, success, failed, avg_pm25, execution_time
         )
 
 # Create global loggers
@@ -0,0 +1,11 @@
+"""
+WSGI entry point for production servers.
+
+Run with:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+`python3 app.py` remains the development path (Flask dev server).
+"""
+from app import create_app
+
+app = create_app()